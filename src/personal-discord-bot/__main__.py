@@ -6,10 +6,12 @@ python -m your_module
 This file contains the primary main() function for your entire project.
 """
 # Standard library imports
-import asyncio
 import logging
+import logging.handlers
+import queue
 from pathlib import Path
 import signal
+import sys
 
 # Third-party library imports
 
@@ -20,6 +22,12 @@ from .config import Config
 
 def main() -> None:
     """Main function of the project."""
+    # maintenance commands, e.g. python -m personal-discord-bot import-imdb ...
+    if len(sys.argv) > 1 and sys.argv[1] == "import-imdb":
+        from .imdb import main as import_imdb
+        import_imdb(sys.argv[2:])
+        return
+
     def signal_handler(sig: signal.Signals, frame) -> None:
         logger.info("Received termination signal. Shutting down...")
         bot.loop.create_task(bot.close())
@@ -38,7 +46,12 @@ def main() -> None:
     formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    # file writes happen on a listener thread, logging never blocks the event loop
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    log_listener.start()
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -46,19 +59,11 @@ def main() -> None:
     bot_config = Config(CONFIG_FILE)
     bot = MyBot(bot_config, logger)
 
-    asyncio.run(bot.setup_cogs())
-    bot.run(bot_config.token)
-
-    # async def run_bot() -> None:
-    #     try:
-    #         await bot.setup_cogs()  # Load cogs in the bot's event loop
-    #         await bot.start(bot_config.token)  # Start the bot
-    #     except Exception as e:
-    #         logger.error(f"Bot failed to start: {e}")
-    #     finally:
-    #         await bot.close()
-
-    # asyncio.run(run_bot())
+    # cogs are set up in MyBot.setup_hook, on the same loop the bot runs on
+    try:
+        bot.run(bot_config.token)
+    finally:
+        log_listener.stop()
 
 
 if __name__ == "__main__":
@@ -5,12 +5,17 @@ basecog.py
 
 # Standard Library Imports
 import asyncio
+import copy
+import functools
+import os
+import stat
 import tempfile
+from collections import defaultdict
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Optional, Union
+from typing import (TYPE_CHECKING, Any, Awaitable, Callable, DefaultDict, Dict, Optional, Tuple,
+                    Union)
 
 # Third-Party Imports
-import yaml
 from discord import TextChannel
 from discord.abc import GuildChannel, PrivateChannel
 from discord.ext import commands
@@ -19,6 +24,8 @@ from discord.threads import Thread
 # Local Application Imports
 from .config import CogConfig
 from .logger import LoggingMiddleware
+from .serialization import Serializer, get_serializer, loads_any
+from .storage import Namespace
 
 # Conditional Typing Imports
 if TYPE_CHECKING:
@@ -26,14 +33,34 @@ if TYPE_CHECKING:
 else:
     MyBot = Any
 
+# read once at import, os.umask can only be queried by setting it
+_UMASK: int = os.umask(0)
+os.umask(_UMASK)
+
 
 class BaseCog(commands.Cog):
     """Base class for all cogs, providing common setup logic"""
 
+    # names of the cogs whose cog_load has to finish before this one's starts
+    depends_on: Tuple[str, ...] = ("LoggingMiddleware",)
+
+    # gateway intents (discord.Intents flag names) the cog needs beyond guilds and messages,
+    # and whether it needs every member of the guild cached (members intent, chunking)
+    intents: Tuple[str, ...] = ()
+    needs_members: bool = False
+
     def __init__(self, bot: MyBot, config: CogConfig) -> None:
         self.bot: MyBot = bot
         self.logger: LoggingMiddleware = None
         self._config: CogConfig = config
+        self._serializer: Serializer = get_serializer(getattr(config, "format", "yaml"))
+
+        # debounced writes: latest data and the task waiting to write it, per path;
+        # the lock keeps writes to one path in order, so older data never lands last
+        self._save_delay: float = getattr(config, "save_delay", 2.0)
+        self._pending_saves: Dict[Path, Any] = {}
+        self._save_tasks: Dict[Path, asyncio.Task] = {}
+        self._save_locks: DefaultDict[Path, asyncio.Lock] = defaultdict(asyncio.Lock)
 
     async def cog_load(self) -> None:
 
@@ -51,6 +78,34 @@ class BaseCog(commands.Cog):
         # Log successful setup
         await self.logger.log_info(self, "Setup completed")
 
+    @property
+    def storage(self) -> Namespace:
+        """this cog's namespace in the bot-wide SQLite store"""
+        return self.bot.storage.namespace(self.__cog_name__)
+
+    async def migrate_file_to_storage(
+            self, file_path: Optional[Path], store: Callable[[Any], Awaitable[None]]) -> None:
+        """
+        Move a legacy data file into the store once.
+
+        The file is renamed to '<name>.migrated' after store has saved its data.
+
+        :param file_path: The legacy file, nothing happens if it doesn't exist
+        :param store: Coroutine function writing the loaded data to self.storage
+        """
+        if file_path is None or not Path(file_path).exists():
+            return
+        data = await self.load_data_from_file(file_path)
+        if data is not None:
+            await store(data)
+        migrated = Path(file_path).with_name(Path(file_path).name + ".migrated")
+        await asyncio.to_thread(Path(file_path).replace, migrated)
+        await self.logger.log_info(self, f"Migrated {file_path} into storage, old file kept as {migrated}.")
+
+    async def cog_unload(self) -> None:
+        """write pending data before the cog goes away"""
+        await self.flush_pending_writes()
+
     async def get_text_channel(self, channel_id: int) -> Optional[TextChannel]:
         """Retrieve and validate a TextChannel by ID.
 
@@ -72,25 +127,95 @@ class BaseCog(commands.Cog):
 
     async def save_data_to_file(self, data: Any, file_path: Path) -> None:
         """
-        Asynchronously save data to a YAML file with atomic writes for safety.
+        Schedule saving data to a file with atomic writes for safety.
+
+        The file is written in the cog's configured format (yaml, json or msgpack).
+
+        Saves to the same path within save_delay seconds are coalesced into
+        one write of the latest data. The write happens in a worker thread
+        through a temporary file, fsync and rename, so a crash never leaves a
+        truncated file behind.
 
         :param data: Data structure to save (e.g., dict or list)
-        :param file_path: Path where the YAML file should be saved
+        :param file_path: Path where the file should be saved
         """
+        file_path = Path(file_path)
+        self._pending_saves[file_path] = data
+        if file_path not in self._save_tasks:
+            task = asyncio.create_task(self._debounced_save(file_path))
+            self._save_tasks[file_path] = task
+            task.add_done_callback(functools.partial(self._forget_save_task, file_path))
+
+    def _forget_save_task(self, file_path: Path, task: asyncio.Task) -> None:
+        # runs however the task ended, also when it was cancelled before it started
+        if self._save_tasks.get(file_path) is task:
+            del self._save_tasks[file_path]
+
+    async def _debounced_save(self, file_path: Path) -> None:
+        await asyncio.sleep(self._save_delay)
+        # saves arriving during the write schedule a new task
+        self._forget_save_task(file_path, asyncio.current_task())
+        await self._write_pending(file_path)
+
+    async def _write_pending(self, file_path: Path) -> None:
+        async with self._save_locks[file_path]:
+            # taken after the previous write finished, so this is the latest data
+            if file_path not in self._pending_saves:
+                return
+            # copy on the event loop, so the worker never sees the data mid-mutation
+            data = copy.deepcopy(self._pending_saves.pop(file_path))
+            try:
+                await asyncio.to_thread(self._sync_save_data_to_file, data, file_path)
+                await self.logger.log_info(self, f"Data written to {file_path}.")
+            except Exception as e:
+                await self.logger.log_error(self, f"Error saving data: {e}")
+
+    async def flush_pending_writes(self) -> None:
+        """write all pending data immediately and wait for writes in flight, e.g. on shutdown"""
+        # only tasks still in their delay are tracked, running writes are left to finish
+        for task in list(self._save_tasks.values()):
+            task.cancel()
+        self._save_tasks.clear()
+        for file_path in list(self._pending_saves):
+            await self._write_pending(file_path)
+        for lock in list(self._save_locks.values()):
+            async with lock:
+                pass
+
+    def _sync_save_data_to_file(self, data: Any, file_path: Path) -> None:
+        raw = self._serializer.dumps(data)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
         try:
-            # Write data directly to the file
-            with file_path.open('w', encoding='utf-8') as yaml_file:
-                yaml.dump(data, yaml_file)
-
-            await self.logger.log_info(self, f"Data written to {file_path}.")
-        except Exception as e:
-            await self.logger.log_error(self, f"Error saving data: {e}")
+            mode = stat.S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK  # what open() would have created
+        with tempfile.NamedTemporaryFile(
+                "wb", dir=file_path.parent, prefix=file_path.name,
+                suffix=".tmp", delete=False) as temp_file:
+            try:
+                temp_file.write(raw)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+                # NamedTemporaryFile creates 0600, keep the permissions of the file it replaces
+                os.chmod(temp_file.name, mode)
+            except BaseException:
+                os.unlink(temp_file.name)
+                raise
+        os.replace(temp_file.name, file_path)
+
+        # persist the rename itself
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(file_path.parent, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
 
     async def load_data_from_file(self, file_path: Path) -> Optional[Any]:
         """
-        Asynchronously load data from a YAML file.
+        Asynchronously load data from a file, the format is detected from its content.
 
-        :param file_path: Path to the YAML file
+        :param file_path: Path to the file
         :return: Loaded data or None if the file doesn't exist or there's an error
         """
         try:
@@ -102,16 +227,16 @@ class BaseCog(commands.Cog):
                 return data
         except FileNotFoundError:
             await self.logger.log_info(self, "Starting with empty data structure.")
-        except yaml.YAMLError as e:
+        except ValueError as e:
             await self.logger.log_error(
-                self, f"Error parsing YAML from {file_path}: {e}")
+                self, f"Error parsing data from {file_path}: {e}")
         except Exception as e:
             await self.logger.log_error(self, f"Unexpected error loading data: {e}")
         return None
 
     def _sync_load_data_from_file(self, file_path: Path) -> Optional[Any]:
-        with open(file_path.as_posix(), "r", encoding="utf-8") as file:
-            return yaml.safe_load(file)
+        with open(file_path.as_posix(), "rb") as file:
+            return loads_any(file.read())
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
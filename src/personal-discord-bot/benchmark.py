@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+benchmark.py
+
+Compares load and save times of the storage formats on a large, cog-like
+state file, e.g.:
+
+python -m personal-discord-bot.benchmark --entries 100000
+"""
+
+# Standard library imports
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# Third-party imports
+import yaml
+
+# Local application imports
+from .serialization import (SERIALIZERS, JsonSerializer, MsgpackSerializer, Serializer,
+                            YamlSerializer, get_serializer, id_keys, loads_any)
+
+
+def make_state(entries: int) -> Dict[int, Any]:
+    """tally-like counters plus reaction-role-like nested entries, keyed by discord ids"""
+    rng = random.Random(42)
+    state: Dict[int, Any] = {}
+    for i in range(entries):
+        user_id = 10**17 + rng.randrange(10**17)
+        if i % 10:
+            state[user_id] = rng.randrange(1000)
+        else:
+            state[user_id] = {
+                "text": "Interessen!",
+                "allow_multiple": bool(i % 2),
+                "reactions": {"🎞️": {"role": "film", "description": "Definitiv bereit für Filmabend!"}},
+            }
+    return state
+
+
+def timed(func: Callable[[], Any], repeat: int) -> float:
+    """best of repeat runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def candidates() -> List[Tuple[str, Serializer]]:
+    """every available format, plus pure-Python YAML as the baseline"""
+    result: List[Tuple[str, Serializer]] = [
+        ("yaml (pure python)", YamlSerializer(yaml.SafeLoader, yaml.SafeDumper)),
+    ]
+    if getattr(yaml, "CSafeLoader", None) is not None:
+        result.append(("yaml (libyaml)", YamlSerializer()))
+    result.append((JsonSerializer.name, JsonSerializer()))
+    try:
+        result.append((MsgpackSerializer.name, get_serializer(MsgpackSerializer.name)))
+    except ValueError:
+        print("msgpack not installed, skipping")
+    return result
+
+
+def main() -> None:
+    """run the benchmark and print a table"""
+    parser = argparse.ArgumentParser(description="Benchmark the storage formats for cog state files.")
+    parser.add_argument("--entries", type=int, default=50000, help="top-level entries in the state")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the best one counts")
+    args = parser.parse_args()
+
+    state = make_state(args.entries)
+    print(f"{args.entries} entries, formats: {', '.join(SERIALIZERS)}")
+    print(f"{'format':<20}{'size':>12}{'save ms':>12}{'load ms':>12}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, serializer in candidates():
+            path = Path(directory, label.replace(" ", "_"))
+            save = timed(lambda: path.write_bytes(serializer.dumps(state)), args.repeat)
+            load = timed(lambda: serializer.loads(path.read_bytes()), args.repeat)
+            assert id_keys(loads_any(path.read_bytes())) == state, f"{label} does not round-trip"
+            print(f"{label:<20}{path.stat().st_size:>12}{save * 1000:>12.1f}{load * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,12 @@
 bot.py
 """
 # Standard library imports
-from typing import List
+import asyncio
+import importlib
+import time
+from pathlib import Path
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple, Type
 from logging import Logger
 
 # Third-party imports
@@ -11,63 +16,181 @@ import discord
 from discord.ext import commands
 
 # Local application imports
-from .config import Config
-from .huggingface import HuggingFace
+from .basecog import BaseCog
+from .config import SCRIPT_DIR, Config
 from .logger import LoggingMiddleware
-from .monitor import Monitor
-from .movie import Movie
-from .music import Music
-from .poll import Poll
-from .reactionroles import ReactionRoles
-from .tally import Tally
+from .storage import Storage
+from .watchdog import LoopWatchdog
+
+# config key -> (module, class), a cog's module is only imported if the cog is enabled
+COGS: Dict[str, Tuple[str, str]] = {
+    "huggingface": (".huggingface", "HuggingFace"),
+    "monitor": (".monitor", "Monitor"),
+    "music": (".music", "Music"),
+    "movie": (".movie", "Movie"),
+    "poll": (".poll", "Poll"),
+    "reactionroles": (".reactionroles", "ReactionRoles"),
+    "tally": (".tally", "Tally"),
+}
+
+# intents every configuration needs: guild state and prefix commands, in guilds and in DMs
+BASE_INTENTS: Tuple[str, ...] = ("guilds", "guild_messages", "dm_messages", "message_content")
 
-# TODO include cogs and respective configs as a dictionary and handle missing cogs
 
 class MyBot(commands.Bot):
     """mybot"""
 
     def __init__(self, config: Config, logger: Logger) -> None:
-        intents = discord.Intents.all()
-        super().__init__(command_prefix="!", intents=intents, case_insensitive=True)
         self.logger: Logger = logger
         self.config: Config = config
 
+        # enabled cogs are imported up front, their declarations decide the intents
+        self._import_times: Dict[str, float] = {}
+        self._cog_classes: Dict[str, Type[BaseCog]] = self._import_cogs()
+        intents, member_cache_flags, chunk = self._gateway_settings()
+        super().__init__(command_prefix="!", intents=intents, case_insensitive=True,
+                         member_cache_flags=member_cache_flags, chunk_guilds_at_startup=chunk)
+
         self.bot_admin: List[int] = self.config.bot_admin
 
+        storage_config: Dict[str, Any] = getattr(self.config, "storage", {}) or {}
+        self.storage: Storage = Storage(
+            Path(SCRIPT_DIR, storage_config.get("path", "res/bot.db")),
+            readers=storage_config.get("readers", 2),
+        )
+        self._shutting_down: bool = False
+
+        watchdog_config: Dict[str, Any] = getattr(self.config, "watchdog", {}) or {}
+        self.watchdog: LoopWatchdog = LoopWatchdog(
+            logger,
+            interval=watchdog_config.get("interval", 0.1),
+            threshold=watchdog_config.get("threshold", 0.25),
+        )
+
+        # gateway events by type since start, for !gateway
+        self.socket_events: Counter = Counter()
+        self.started_at: float = time.monotonic()
+
+    def _import_cogs(self) -> Dict[str, Type[BaseCog]]:
+        """import the modules of the enabled cogs, by config key"""
+        for key in self.config.cogs:
+            if key not in COGS:
+                self.logger.warning(f"Unknown cog '{key}' in config, ignored.")
+
+        classes: Dict[str, Type[BaseCog]] = {}
+        for key, (module_name, class_name) in COGS.items():
+            cog_config = self.config.cogs.get(key)
+            if cog_config is None:
+                self.logger.info(f"No config section for cog '{key}', skipped.")
+                continue
+            if not cog_config.enabled:
+                continue
+
+            import_started = time.perf_counter()
+            try:
+                classes[key] = getattr(importlib.import_module(module_name, __package__), class_name)
+            except ImportError as e:
+                self.logger.error(f"Could not import cog '{key}': {e}")
+                continue
+            self._import_times[class_name] = time.perf_counter() - import_started
+        return classes
+
+    def _gateway_settings(self) -> Tuple[discord.Intents, discord.MemberCacheFlags, bool]:
+        """Minimal intents, member cache and chunking for the enabled cogs.
+
+        'intents: all' in the config restores the old subscribe-to-everything
+        setup, e.g. to compare memory use and event rates.
+        """
+        if getattr(self.config, "intents", None) == "all":
+            return discord.Intents.all(), discord.MemberCacheFlags.all(), True
+
+        intents = discord.Intents.none()
+        for name in BASE_INTENTS + tuple(flag for cog in self._cog_classes.values() for flag in cog.intents):
+            setattr(intents, name, True)
+        needs_members = any(cog.needs_members for cog in self._cog_classes.values())
+        intents.members = intents.members or needs_members
+        member_cache_flags = discord.MemberCacheFlags.none()
+        member_cache_flags.voice = intents.voice_states
+        member_cache_flags.joined = needs_members
+        return intents, member_cache_flags, needs_members
+
+    async def setup_hook(self) -> None:
+        """runs once on the bot's own loop after login, before the gateway connects"""
+        self.watchdog.start()
+        await self.setup_cogs()
+
     async def setup_cogs(self) -> None:
-        """setup cogs"""
+        """setup the storage, the logger and every enabled cog, with a timing report"""
+        started = time.perf_counter()
+        await self.storage.start()
+
         logger_cog = LoggingMiddleware(self)
         await self.add_cog(logger_cog)
 
-        if self.config.cogs["huggingface"].enabled:
-            huggingface_cog = HuggingFace(self, self.config.cogs["huggingface"])
-            await self.add_cog(huggingface_cog)
+        cogs: List[BaseCog] = []
+        for key, cog_class in self._cog_classes.items():
+            try:
+                cogs.append(cog_class(self, self.config.cogs[key]))
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.error(f"Could not create cog '{key}': {e}")
+
+        load_times = await self._load_concurrently(cogs)
+        report = [f"{name} (import {self._import_times.get(name, 0) * 1000:.0f} ms, setup {load_time * 1000:.0f} ms)"
+                  for name, load_time in load_times.items()]
+        self.logger.info(
+            f"Loaded {len(report)} cogs in {(time.perf_counter() - started) * 1000:.0f} ms: {', '.join(report)}")
+
+    async def invoke(self, ctx: commands.Context) -> None:
+        # stamped here rather than in on_command, listeners run as separate tasks
+        ctx.started_at = time.perf_counter()
+        await super().invoke(ctx)
 
-        if self.config.cogs["monitor"].enabled:
-            monitor_cog = Monitor(self, self.config.cogs["monitor"])
-            await self.add_cog(monitor_cog)
+    async def on_socket_event_type(self, event_type: str) -> None:
+        self.socket_events[event_type] += 1
 
-        if self.config.cogs["music"].enabled:
-            music_cog = Music(self)
-            await self.add_cog(music_cog)
+    async def _load_concurrently(self, cogs: List[BaseCog]) -> Dict[str, float]:
+        """Add cogs in waves: every cog whose dependencies are loaded starts at once.
 
-        if self.config.cogs["movie"].enabled:
-            movie_cog = Movie(self, self.config.cogs["movie"])
-            await self.add_cog(movie_cog)
+        Returns:
+            Dict[str, float]: Seconds each loaded cog's cog_load took, by cog name.
+        """
+        load_times: Dict[str, float] = {}
+        pending = {cog.__cog_name__: cog for cog in cogs}
 
-        if self.config.cogs["poll"].enabled:
-            poll_cog = Poll(self, self.config.cogs["poll"])
-            await self.add_cog(poll_cog)
-        
-        if self.config.cogs["reactionroles"].enabled:
-            reactionroles_cog = ReactionRoles(self, self.config.cogs["reactionroles"])
-            await self.add_cog(reactionroles_cog)
+        async def load(cog: BaseCog) -> Optional[float]:
+            started = time.perf_counter()
+            try:
+                await self.add_cog(cog)
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.error(f"Could not load cog '{cog.__cog_name__}': {e}")
+                return None
+            return time.perf_counter() - started
 
-        if self.config.cogs["tally"].enabled:
-            tally_cog = Tally(self, self.config.cogs["tally"])
-            await self.add_cog(tally_cog)
+        while pending:
+            ready = [cog for cog in pending.values() if all(name in self.cogs for name in cog.depends_on)]
+            if not ready:
+                for name, cog in pending.items():
+                    missing = [dependency for dependency in cog.depends_on if dependency not in self.cogs]
+                    self.logger.error(f"Could not load cog '{name}', missing dependencies: {', '.join(missing)}")
+                break
+            for cog, load_time in zip(ready, await asyncio.gather(*(load(cog) for cog in ready))):
+                del pending[cog.__cog_name__]
+                if load_time is not None:
+                    load_times[cog.__cog_name__] = load_time
+        return load_times
 
     async def close(self) -> None:
-        """close bot"""
+        """unload the cogs (draining their background work), then close the storage and the connection"""
+        if self._shutting_down:
+            return  # e.g. the signal handler and bot.run both close the bot
+        self._shutting_down = True
         self.logger.info("Bot is shutting down.")
+        # reverse load order, so LoggingMiddleware stays available until the end
+        for name in reversed(list(self.cogs)):
+            try:
+                await self.remove_cog(name)
+            except Exception as e:  # pylint: disable=broad-except
+                self.logger.error(f"Error while unloading cog '{name}': {e}")
+        await self.storage.close()
+        await self.watchdog.stop()
         await super().close()
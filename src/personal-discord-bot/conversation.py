@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+conversation.py
+
+Bounded per-channel chat history for the HuggingFace cog.
+"""
+
+# Standard library imports
+import time
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional, Tuple
+
+# (role, text, approximate token count)
+Turn = Tuple[str, str, int]
+
+
+def approx_tokens(text: str) -> int:
+    """cheap token estimate, roughly four characters per token for latin text"""
+    return len(text) // 4 + 1
+
+
+class ChannelHistory:
+    """ring buffer of the most recent turns of one channel"""
+
+    __slots__ = ("turns", "tokens", "last_used")
+
+    def __init__(self, max_turns: int) -> None:
+        self.turns: Deque[Turn] = deque(maxlen=max_turns)
+        self.tokens: int = 0
+        self.last_used: float = time.monotonic()
+
+    def append(self, turn: Turn) -> int:
+        """append a turn and return the token delta (a full buffer drops its oldest turn)"""
+        dropped = self.turns[0][2] if len(self.turns) == self.turns.maxlen else 0
+        self.turns.append(turn)
+        delta = turn[2] - dropped
+        self.tokens += delta
+        return delta
+
+    def popleft(self) -> int:
+        """drop the oldest turn and return its token count"""
+        tokens = self.turns.popleft()[2]
+        self.tokens -= tokens
+        return tokens
+
+
+class ConversationMemory:
+    """per-channel histories with a token budget per prompt and a global token cap"""
+
+    def __init__(
+        self,
+        max_turns: int = 12,
+        token_budget: int = 1024,
+        idle_timeout: float = 1800.0,
+        max_total_tokens: int = 50000,
+    ) -> None:
+        """
+        Args:
+            max_turns: Turns (user and assistant messages) kept per channel.
+            token_budget: Upper bound of history tokens handed to the model per prompt.
+            idle_timeout: Seconds after which an unused channel history is dropped.
+            max_total_tokens: Upper bound of tokens kept across all channels.
+        """
+        self.max_turns: int = max_turns
+        self.token_budget: int = token_budget
+        self.idle_timeout: float = idle_timeout
+        self.max_total_tokens: int = max_total_tokens
+
+        # least recently used channel first
+        self._channels: OrderedDict[int, ChannelHistory] = OrderedDict()
+        self.total_tokens: int = 0
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def _evict_idle(self, now: float) -> None:
+        """drop histories that have not been used within idle_timeout"""
+        while self._channels:
+            channel_id, history = next(iter(self._channels.items()))
+            if now - history.last_used < self.idle_timeout:
+                break
+            self.forget(channel_id)
+
+    def _enforce_cap(self) -> None:
+        """drop oldest turns of the least recently used channels until under the global cap"""
+        while self.total_tokens > self.max_total_tokens and self._channels:
+            channel_id, history = next(iter(self._channels.items()))
+            self.total_tokens -= history.popleft()
+            if not history.turns:
+                del self._channels[channel_id]
+
+    def add(self, channel_id: int, role: str, text: str) -> None:
+        """record a turn ('user' or 'assistant') for a channel"""
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        history = self._channels.get(channel_id)
+        if history is None:
+            history = self._channels[channel_id] = ChannelHistory(self.max_turns)
+        else:
+            self._channels.move_to_end(channel_id)
+        history.last_used = now
+
+        self.total_tokens += history.append((role, text, approx_tokens(text)))
+        self._enforce_cap()
+
+    def context(self, channel_id: int, reserve: int = 0) -> List[Tuple[str, str]]:
+        """Newest turns of a channel that fit into the token budget, oldest first.
+
+        Args:
+            channel_id: The channel to fetch history for.
+            reserve: Tokens of the budget already used by the upcoming prompt.
+        """
+        self._evict_idle(time.monotonic())
+        history: Optional[ChannelHistory] = self._channels.get(channel_id)
+        if history is None:
+            return []
+
+        budget = self.token_budget - reserve
+        selected: List[Tuple[str, str]] = []
+        for role, text, tokens in reversed(history.turns):
+            if tokens > budget:
+                break
+            budget -= tokens
+            selected.append((role, text))
+        selected.reverse()
+        return selected
+
+    def forget(self, channel_id: int) -> None:
+        """drop the history of a channel"""
+        history = self._channels.pop(channel_id, None)
+        if history is not None:
+            self.total_tokens -= history.tokens
@@ -4,18 +4,24 @@ HuggingFace cog class
 """
 
 # Standard library imports
+import asyncio
 import httpx
 import io
+import random
 import re
-from typing import TYPE_CHECKING, Any, Dict, Optional
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, TypeVar
 
 # Third-party library imports
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 # Local application imports
 from .basecog import BaseCog
 from .config import CogConfig
+from .conversation import ConversationMemory, approx_tokens
+from .inference import InferenceBackend, ModelLoadingError, create_backend
 
 # Conditional imports for type checking
 if TYPE_CHECKING:
@@ -23,51 +29,131 @@ if TYPE_CHECKING:
 else:
     MyBot = Any
 
+T = TypeVar("T")
+
 
 class HuggingFace(BaseCog):
     def __init__(self, bot: MyBot, config: CogConfig) -> None:
         super().__init__(bot, config)
-        self.base_api_url: str = self._config.api_url  # type: ignore
-        self.headers: Dict[str, str] = {
-            "Authorization": f"Bearer {self._config.token}"}  # type: ignore
-
-    async def generate_response(self, prompt: str, max_tokens: int = 2048) -> str:
-        """Generates a response from the DeepSeek R1 model."""
-
-        api_url: str = self.base_api_url + \
-            self._config.text_to_text["model"]  # type: ignore
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_new_tokens": max_tokens,
-                "temperature": 0.6,
-                "top_p": 0.95, 
-                "do_sample": True,
-                "return_full_text": False
-            }
-        }
+        self.backend: InferenceBackend = create_backend(self._config)
+
+        cold_start: Dict[str, Any] = getattr(self._config, "cold_start", {}) or {}
+        self._max_retries: int = cold_start.get("max_retries", 3)
+        self._max_wait: float = cold_start.get("max_wait", 120.0)
+        self._base_backoff: float = cold_start.get("base_backoff", 2.0)
+
+        keep_warm: Dict[str, Any] = getattr(self._config, "keep_warm", {}) or {}
+        self._keep_warm_enabled: bool = keep_warm.get("enabled", False)
+        self._keep_warm_interval: float = keep_warm.get("interval", 10)
+        self._active_hours: List[int] = keep_warm.get("active_hours", [8, 23])
+
+        memory: Dict[str, Any] = getattr(self._config, "memory", {}) or {}
+        self.memory: ConversationMemory = ConversationMemory(
+            max_turns=memory.get("max_turns", 12),
+            token_budget=memory.get("token_budget", 1024),
+            idle_timeout=memory.get("idle_timeout", 30) * 60,
+            max_total_tokens=memory.get("max_total_tokens", 50000),
+        )
+
+        # cold-start metrics, per model
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    async def cog_load(self) -> None:
+        await super().cog_load()
+        await self.backend.start()
+        await self.logger.log_info(self, f"Using '{self.backend.name}' inference backend.")
+        if self._keep_warm_enabled:
+            self._keep_warm.change_interval(minutes=self._keep_warm_interval)
+            self._keep_warm.start()
+
+    async def cog_unload(self) -> None:
+        self._keep_warm.cancel()
+        await self.backend.close()
+        await super().cog_unload()
+
+    def _record(self, model: str, cold: bool, added_latency: float = 0.0) -> None:
+        """record one request and its cold-start penalty for a model"""
+        entry = self.stats.setdefault(
+            model, {"requests": 0, "cold_starts": 0, "cold_latency": 0.0})
+        entry["requests"] += 1
+        if cold:
+            entry["cold_starts"] += 1
+            entry["cold_latency"] += added_latency
+
+    def _cold_start_delay(self, estimated: float, attempt: int) -> float:
+        """seconds to wait before retrying a loading model"""
+        # wait at least the estimate, back off exponentially and add upward-only
+        # jitter so concurrent callers don't hit the endpoint in lockstep
+        backoff = self._base_backoff * (2 ** attempt)
+        delay = max(estimated, backoff)
+        return min(self._max_wait, delay + random.uniform(0, 0.2 * delay))
+
+    async def _call(self, model: str, request: Callable[[], Awaitable[T]]) -> T:
+        """Run a backend request, waiting out cold starts based on estimated_time.
+
+        Raises:
+            ModelLoadingError: If the model is still loading after all retries.
+            httpx.HTTPError: For network errors and any other 4xx/5xx response.
+        """
+        started = time.perf_counter()
+        cold = False
+
+        for attempt in range(self._max_retries + 1):
+            try:
+                result = await request()
+            except ModelLoadingError as e:
+                cold = True
+                if attempt == self._max_retries:
+                    self._record(model, True, time.perf_counter() - started)
+                    raise
+                delay = self._cold_start_delay(e.estimated_time, attempt)
+                await self.logger.log_warning(
+                    self, f"{model} is loading, retrying in {delay:.1f}s ({attempt + 1}/{self._max_retries}).")
+                await asyncio.sleep(delay)
+                continue
+
+            added = time.perf_counter() - started if cold else 0.0
+            self._record(model, cold, added)
+            if cold:
+                await self.logger.log_info(
+                    self, f"{model} warmed up after {attempt} retries, added {added:.1f}s latency.")
+            return result
+
+        raise AssertionError("unreachable")
+
+    async def generate_response(self, prompt: str, max_tokens: int = 2048, channel_id: Optional[int] = None) -> str:
+        """Generates a response from the DeepSeek R1 model.
+
+        If channel_id is given, earlier turns of that channel are sent along
+        and the new exchange is remembered.
+        """
+
+        model: str = self._config.text_to_text["model"]  # type: ignore
+        history = self.memory.context(channel_id, approx_tokens(prompt)) if channel_id is not None else []
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:  # 30s timeout
-                response = await client.post(api_url, headers=self.headers, json=payload)
-                response.raise_for_status()
+            raw_text = await self._call(
+                model, lambda: self.backend.generate_text(model, prompt, max_tokens, history))
+            if not raw_text:
+                await self.logger.log_warning(self, "Empty or invalid API response.")
+                return "Hmm, I didn’t get a proper response from the AI."
 
-                data = response.json()
-                if not data or not isinstance(data, list) or not data[0]:
-                    await self.logger.log_warning(self, "Empty or invalid API response.")
-                    return "Hmm, I didn’t get a proper response from the AI."
+            cleaned_text = re.sub(r"\n{2,}", "\n", raw_text).strip()
 
-                raw_text = data[0].get(
-                    "generated_text", "No response received.")
-                cleaned_text = re.sub(r"\n{2,}", "\n", raw_text).strip()
+            if max_tokens and len(cleaned_text) > max_tokens:
+                cleaned_text = cleaned_text[:max_tokens].rsplit(" ", 1)[
+                    0] + "..."
 
-                if max_tokens and len(cleaned_text) > max_tokens:
-                    cleaned_text = cleaned_text[:max_tokens].rsplit(" ", 1)[
-                        0] + "..."
-                return cleaned_text
+            if channel_id is not None:
+                self.memory.add(channel_id, "user", prompt)
+                self.memory.add(channel_id, "assistant", cleaned_text)
+            return cleaned_text
 
+        except ModelLoadingError as e:
+            await self.logger.log_warning(self, str(e))
+            return "The AI model is still waking up, please try again in a minute."
         except httpx.RequestError as e:
-            error_msg = f"Network error contacting Hugging Face API: {str(e)}"
+            error_msg = f"Network error contacting {self.backend.name} API: {str(e)}"
             await self.logger.log_error(self, error_msg)
             return "Sorry, I couldn’t reach the AI service right now."
         except httpx.HTTPStatusError as e:
@@ -81,24 +167,16 @@ class HuggingFace(BaseCog):
     async def generate_image(self, prompt: str) -> Optional[bytes]:
         """Generates an image from a text prompt using DALL-E Mini."""
 
-        api_url: str = self.base_api_url + \
-            self._config.text_to_image["model"] # type: ignore
-        payload = {
-            "inputs": prompt,
-        }
+        model: str = self._config.text_to_image["model"]  # type: ignore
 
         try:
-            # 30s timeout is plenty
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(api_url, headers=self.headers, json=payload)
-                response.raise_for_status()  # Raises exception for 4xx/5xx status codes
-
-                # API returns image as raw bytes
-                image_bytes = response.content
-                return image_bytes
+            return await self._call(model, lambda: self.backend.generate_image(model, prompt))
 
+        except ModelLoadingError as e:
+            await self.logger.log_warning(self, str(e))
+            return None
         except httpx.RequestError as e:
-            error_msg = f"Network error contacting Hugging Face API: {str(e)}"
+            error_msg = f"Network error contacting {self.backend.name} API: {str(e)}"
             await self.logger.log_error(self, error_msg)
             return None
         except httpx.HTTPStatusError as e:
@@ -109,6 +187,42 @@ class HuggingFace(BaseCog):
             await self.logger.log_error(self, f"Unexpected error: {str(e)}")
             return None
 
+    def _is_active_hour(self) -> bool:
+        """checks if the current local hour lies within the configured active hours"""
+        start, end = self._active_hours
+        hour = datetime.now().hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end  # window wraps around midnight
+
+    @tasks.loop(minutes=10)
+    async def _keep_warm(self) -> None:
+        """ping the configured models so they stay loaded during active hours"""
+        if not self._is_active_hour():
+            return
+
+        models: List[str] = []
+        for section in (self._config.text_to_text, self._config.text_to_image):  # type: ignore
+            if section.get("enabled") and section.get("model"):
+                models.append(section["model"])
+
+        for model in models:
+            try:
+                if await self.backend.ping(model):
+                    await self.logger.log_info(self, f"keep-warm: {model} was cold, loading triggered.")
+            except httpx.HTTPError as e:
+                await self.logger.log_warning(self, f"keep-warm ping for {model} failed: {e}")
+
+        for model, entry in self.stats.items():
+            rate = entry["cold_starts"] / entry["requests"] if entry["requests"] else 0.0
+            await self.logger.log_info(
+                self, f"{model}: {int(entry['requests'])} requests, cold-start rate {rate:.1%}, "
+                f"{entry['cold_latency']:.1f}s added latency.")
+
+    @_keep_warm.before_loop
+    async def _before_keep_warm(self) -> None:
+        await self.bot.wait_until_ready()
+
     @commands.command(name="imagine", aliases=["img", "draw"])
     @commands.cooldown(1, 60, commands.BucketType.user)
     async def imagine_command(self, ctx: commands.Context, *, prompt: str) -> None:
@@ -138,9 +252,16 @@ class HuggingFace(BaseCog):
             await ctx.send("Text-to-Text ist momentan deaktiviert ...")
             return
 
-        response = await self.generate_response(prompt)
+        response = await self.generate_response(prompt, channel_id=ctx.channel.id)
         await ctx.send(response)
 
+    @commands.command(name="forget", aliases=["reset_chat"])
+    async def forget_command(self, ctx: commands.Context) -> None:
+        """Handles the !forget command to drop the chat history of this channel."""
+
+        self.memory.forget(ctx.channel.id)
+        await ctx.send("Okay, I forgot our conversation in this channel.")
+
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         await self.bot.wait_until_ready()
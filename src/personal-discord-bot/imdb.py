@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+imdb.py
+
+Streaming importer for the IMDb datasets (https://datasets.imdbws.com/)
+into the Movie cog's SQLite database:
+
+python -m personal-discord-bot import-imdb --basics title.basics.tsv.gz --ratings title.ratings.tsv.gz
+"""
+
+# Standard library imports
+import argparse
+import csv
+import gzip
+import itertools
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Local application imports
+from .config import SCRIPT_DIR
+from .moviedb import prepare_candidates
+from .moviefeatures import build_features, features_path
+
+# the title files have fields longer than csv's default limit
+csv.field_size_limit(sys.maxsize)
+
+Row = Tuple[Any, ...]
+
+TABLES = {
+    "TitleBasics": """CREATE TABLE IF NOT EXISTS TitleBasics (
+                          tconst TEXT PRIMARY KEY,
+                          titleType TEXT,
+                          primaryTitle TEXT,
+                          originalTitle TEXT,
+                          isAdult INTEGER,
+                          startYear INTEGER,
+                          endYear INTEGER,
+                          runtimeMinutes INTEGER,
+                          genres TEXT
+                      ) WITHOUT ROWID""",
+    "TitleRatings": """CREATE TABLE IF NOT EXISTS TitleRatings (
+                           tconst TEXT PRIMARY KEY,
+                           averageRating REAL,
+                           numVotes INTEGER
+                       ) WITHOUT ROWID""",
+}
+
+# secondary indexes, built after a fresh load instead of maintained row by row
+INDEXES = {
+    "idx_basics_type": "CREATE INDEX IF NOT EXISTS idx_basics_type ON TitleBasics(titleType)",
+}
+
+
+def _int(value: str) -> Optional[int]:
+    return None if value == "\\N" else int(value)
+
+
+def _text(value: str) -> Optional[str]:
+    return None if value == "\\N" else value
+
+
+def read_tsv(path: Path) -> Iterator[List[str]]:
+    """stream the rows of a (gzipped) IMDb TSV file, without the header"""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8", newline="") as file:  # type: ignore
+        reader = csv.reader(file, delimiter="\t", quoting=csv.QUOTE_NONE)
+        next(reader, None)
+        yield from reader
+
+
+def basics_rows(path: Path) -> Iterator[Row]:
+    for tconst, title_type, primary, original, adult, start, end, runtime, genres in read_tsv(path):
+        yield (tconst, title_type, primary, original, _int(adult), _int(start), _int(end),
+               _int(runtime), _text(genres))
+
+
+def ratings_rows(path: Path) -> Iterator[Row]:
+    for tconst, rating, votes in read_tsv(path):
+        yield tconst, float(rating), int(votes)
+
+
+def batched(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def upsert_sql(table: str, columns: Sequence[str]) -> str:
+    """insert new rows, update changed ones and leave unchanged rows untouched"""
+    values = ", ".join(columns[1:])
+    excluded = ", ".join(f"excluded.{column}" for column in columns[1:])
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({columns[0]}) DO UPDATE SET ({values}) = ({excluded}) "
+            f"WHERE ({values}) IS NOT ({excluded})")
+
+
+def load_table(conn: sqlite3.Connection, table: str, columns: Sequence[str], rows: Iterable[Row],
+               batch_size: int, transaction_rows: int, report: Callable[[str], None]) -> int:
+    """bulk-upsert rows in batches, committing every transaction_rows rows"""
+    sql = upsert_sql(table, columns)
+    total = uncommitted = 0
+    started = time.perf_counter()
+    conn.execute("BEGIN")
+    for batch in batched(rows, batch_size):
+        conn.executemany(sql, batch)
+        total += len(batch)
+        uncommitted += len(batch)
+        if uncommitted >= transaction_rows:
+            uncommitted = 0
+            conn.execute("COMMIT")
+            report(f"{table}: {total} rows ({total / (time.perf_counter() - started):.0f}/s)")
+            conn.execute("BEGIN")
+    conn.execute("COMMIT")
+    return total
+
+
+def import_imdb(db_path: Path, basics: Path, ratings: Path, batch_size: int = 20000,
+                transaction_rows: int = 500000, report: Callable[[str], None] = print) -> None:
+    """Import or update the IMDb title and rating tables, then rebuild derived tables.
+
+    Rows are streamed from the gzipped files in batches, so memory stays
+    bounded regardless of file size. Re-running updates changed rows in place.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")  # the import can simply be re-run after a crash
+        conn.execute("PRAGMA cache_size = -262144")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        for schema in TABLES.values():
+            conn.execute(schema)
+
+        fresh = conn.execute("SELECT NOT EXISTS (SELECT 1 FROM TitleBasics)").fetchone()[0]
+        if fresh:
+            for name in INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+        started = time.perf_counter()
+        load_table(conn, "TitleBasics",
+                   ("tconst", "titleType", "primaryTitle", "originalTitle", "isAdult", "startYear",
+                    "endYear", "runtimeMinutes", "genres"),
+                   basics_rows(basics), batch_size, transaction_rows, report)
+        load_table(conn, "TitleRatings", ("tconst", "averageRating", "numVotes"),
+                   ratings_rows(ratings), batch_size, transaction_rows, report)
+
+        report("building indexes ...")
+        for statement in INDEXES.values():
+            conn.execute(statement)
+
+        report("building movie candidate tables ...")
+        count = prepare_candidates(conn)
+        try:
+            report("building movie feature vectors ...")
+            build_features(conn, features_path(db_path))
+        except ValueError as e:
+            report(f"skipped feature vectors: {e}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        report(f"done: {count} movie candidates in {time.perf_counter() - started:.0f}s")
+    finally:
+        conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """command line entry point for 'import-imdb'"""
+    parser = argparse.ArgumentParser(
+        prog="import-imdb", description="Import the IMDb title and rating datasets into the movie database.")
+    parser.add_argument("--basics", type=Path, required=True, help="title.basics.tsv.gz")
+    parser.add_argument("--ratings", type=Path, required=True, help="title.ratings.tsv.gz")
+    parser.add_argument("--db", type=Path, default=Path(SCRIPT_DIR, "res/movies.db"),
+                        help="database to create or update (default: res/movies.db)")
+    parser.add_argument("--batch-size", type=int, default=20000, help="rows per executemany")
+    args = parser.parse_args(argv)
+    import_imdb(args.db, args.basics, args.ratings, batch_size=args.batch_size)
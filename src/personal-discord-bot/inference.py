@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+inference.py
+
+Backends used by the HuggingFace cog to talk to text and image models.
+"""
+
+# Standard library imports
+import base64
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Third-party library imports
+import httpx
+
+# Local application imports
+from .config import CogConfig
+from .stubserver import StubServer
+
+
+class ModelLoadingError(Exception):
+    """raised when a model is not ready yet (cold start)"""
+
+    def __init__(self, model: str, estimated_time: float) -> None:
+        super().__init__(f"{model} is loading (estimated {estimated_time:.1f}s)")
+        self.model: str = model
+        self.estimated_time: float = estimated_time
+
+
+class InferenceBackend(ABC):
+    """interface between the HuggingFace cog and an inference endpoint"""
+
+    name: str = "base"
+
+    def __init__(self, api_url: str, token: Optional[str] = None, timeout: float = 30.0) -> None:
+        self.api_url: str = api_url
+        self.headers: Dict[str, str] = {}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        self._timeout: float = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """shared client, so connections are reused between requests"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self._timeout, headers=self.headers)
+        return self._client
+
+    async def start(self) -> None:
+        """prepare the backend (open connections, start servers)"""
+
+    async def close(self) -> None:
+        """release all resources held by the backend"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @abstractmethod
+    async def generate_text(
+        self, model: str, prompt: str, max_tokens: int, history: Sequence[Tuple[str, str]] = ()
+    ) -> str:
+        """Generate text for a prompt.
+
+        Args:
+            model: Model name as understood by the endpoint.
+            prompt: The new user message.
+            max_tokens: Upper bound of generated tokens.
+            history: Earlier (role, text) turns of the conversation, oldest first.
+
+        Raises:
+            ModelLoadingError: If the model is still loading.
+            httpx.HTTPError: For network errors and 4xx/5xx responses.
+        """
+
+    @abstractmethod
+    async def generate_image(self, model: str, prompt: str) -> bytes:
+        """Generate an image for a prompt and return the raw image bytes.
+
+        Raises:
+            ModelLoadingError: If the model is still loading.
+            httpx.HTTPError: For network errors and 4xx/5xx responses.
+        """
+
+    async def ping(self, model: str) -> bool:
+        """Nudge a model so it stays loaded.
+
+        Returns:
+            bool: True if the model was cold and had to be loaded.
+        """
+        return False
+
+
+class HuggingFaceBackend(InferenceBackend):
+    """hosted HuggingFace inference API (base_url + model)"""
+
+    name = "huggingface"
+
+    def _check_loading(self, model: str, response: httpx.Response) -> None:
+        """raise ModelLoadingError for a 503 carrying estimated_time"""
+        if response.status_code != 503:
+            return
+        try:
+            estimated = float(response.json().get("estimated_time"))
+        except (ValueError, TypeError, AttributeError):
+            return
+        raise ModelLoadingError(model, estimated)
+
+    async def _post(self, model: str, payload: Dict[str, Any]) -> httpx.Response:
+        response = await self.client.post(self.api_url + model, json=payload)
+        self._check_loading(model, response)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _transcript(prompt: str, history: Sequence[Tuple[str, str]]) -> str:
+        """flatten the conversation into a plain-text prompt"""
+        if not history:
+            return prompt
+        lines = [f"{'User' if role == 'user' else 'Assistant'}: {text}" for role, text in history]
+        lines.append(f"User: {prompt}")
+        lines.append("Assistant:")
+        return "\n".join(lines)
+
+    async def generate_text(
+        self, model: str, prompt: str, max_tokens: int, history: Sequence[Tuple[str, str]] = ()
+    ) -> str:
+        payload = {
+            "inputs": self._transcript(prompt, history),
+            "parameters": {
+                "max_new_tokens": max_tokens,
+                "temperature": 0.6,
+                "top_p": 0.95,
+                "do_sample": True,
+                "return_full_text": False
+            }
+        }
+        data = (await self._post(model, payload)).json()
+        if not data or not isinstance(data, list) or not data[0]:
+            return ""
+        return data[0].get("generated_text", "")
+
+    async def generate_image(self, model: str, prompt: str) -> bytes:
+        # API returns image as raw bytes
+        return (await self._post(model, {"inputs": prompt})).content
+
+    async def ping(self, model: str) -> bool:
+        # ask the API to report (not wait) if the model has to load
+        payload = {"inputs": "ping", "parameters": {"max_new_tokens": 1},
+                   "options": {"wait_for_model": False}}
+        try:
+            await self._post(model, payload)
+        except ModelLoadingError:
+            return True
+        return False
+
+
+class OpenAIBackend(InferenceBackend):
+    """any OpenAI-compatible endpoint (vLLM, llama.cpp server, LocalAI, ...)"""
+
+    name = "openai"
+
+    async def generate_text(
+        self, model: str, prompt: str, max_tokens: int, history: Sequence[Tuple[str, str]] = ()
+    ) -> str:
+        messages: List[Dict[str, str]] = [{"role": role, "content": text} for role, text in history]
+        messages.append({"role": "user", "content": prompt})
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0.6,
+            "top_p": 0.95,
+        }
+        response = await self.client.post(self.api_url.rstrip("/") + "/chat/completions", json=payload)
+        response.raise_for_status()
+        choices = response.json().get("choices") or []
+        if not choices:
+            return ""
+        return choices[0].get("message", {}).get("content", "")
+
+    async def generate_image(self, model: str, prompt: str) -> bytes:
+        payload = {"model": model, "prompt": prompt, "n": 1, "response_format": "b64_json"}
+        response = await self.client.post(self.api_url.rstrip("/") + "/images/generations", json=payload)
+        response.raise_for_status()
+        data = response.json().get("data") or [{}]
+        return base64.b64decode(data[0].get("b64_json", ""))
+
+
+class StubBackend(HuggingFaceBackend):
+    """HuggingFace protocol against an in-process stub server, for offline runs"""
+
+    name = "stub"
+
+    def __init__(self, server: StubServer, timeout: float = 30.0) -> None:
+        super().__init__("", timeout=timeout)
+        self.server: StubServer = server
+
+    async def start(self) -> None:
+        await self.server.start()
+        self.api_url = self.server.url + "/models/"
+
+    async def close(self) -> None:
+        await super().close()
+        await self.server.stop()
+
+
+BACKENDS = {
+    HuggingFaceBackend.name: HuggingFaceBackend,
+    OpenAIBackend.name: OpenAIBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def create_backend(config: CogConfig) -> InferenceBackend:
+    """Build the backend selected by the cog config's 'backend' key.
+
+    Raises:
+        ValueError: If the backend name is unknown.
+    """
+    name: str = getattr(config, "backend", HuggingFaceBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}' ({', '.join(BACKENDS)})")
+
+    if name == StubBackend.name:
+        stub: Dict[str, Any] = getattr(config, "stub", {}) or {}
+        return StubBackend(StubServer(**stub))
+
+    return BACKENDS[name](config.api_url, getattr(config, "token", None))  # type: ignore
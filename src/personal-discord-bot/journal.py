@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+journal.py
+
+Append-only event journal with periodic compaction into a snapshot file.
+"""
+
+# Standard library imports
+import asyncio
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Local application imports
+from .serialization import Serializer, YamlSerializer, loads_any
+
+
+class Journal:
+    """Event log next to a snapshot file.
+
+    Every event gets a sequence number. The snapshot records the sequence
+    number of the last event folded into it, so replaying the journal after
+    a crash between writing the snapshot and truncating the journal never
+    applies an event twice. All file access runs on one worker thread, which
+    keeps appends and compactions in submission order and off the event loop.
+    """
+
+    def __init__(self, path: Path, serializer: Optional[Serializer] = None) -> None:
+        """
+        Args:
+            path: Snapshot file, the journal is stored next to it with a '.journal' suffix.
+            serializer: Format of the snapshot, YAML by default. Existing
+                snapshots are read in whatever format they were written.
+        """
+        self.path: Path = Path(path)
+        self.serializer: Serializer = serializer or YamlSerializer()
+        self.journal_path: Path = self.path.with_name(self.path.name + ".journal")
+        self.seq: int = 0
+        self.pending: int = 0  # events appended since the last compaction
+
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"journal-{self.path.stem}")
+
+    async def _run(self, func: Any, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def load(self) -> Tuple[Optional[Any], List[Dict[str, Any]]]:
+        """Read the snapshot and the events appended after it.
+
+        Returns:
+            Tuple[Optional[Any], List[Dict[str, Any]]]: The snapshot state (None if
+            there is none yet) and the journal events not contained in it, in order.
+        """
+        return await self._run(self._sync_load)
+
+    def _sync_load(self) -> Tuple[Optional[Any], List[Dict[str, Any]]]:
+        state: Optional[Any] = None
+        snapshot_seq = 0
+        if self.path.exists():
+            snapshot = loads_any(self.path.read_bytes())
+            if isinstance(snapshot, dict) and "seq" in snapshot and "state" in snapshot:
+                snapshot_seq = snapshot["seq"]
+                state = snapshot["state"]
+            else:
+                # plain state written before the journal existed
+                state = snapshot
+
+        events: List[Dict[str, Any]] = []
+        if self.journal_path.exists():
+            valid_end = 0
+            with self.journal_path.open("rb") as file:
+                for line in file:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated line")
+                        event = json.loads(line)
+                    except ValueError:
+                        break  # torn write at the end of the journal
+                    valid_end += len(line)
+                    if event.get("seq", 0) > snapshot_seq:
+                        events.append(event)
+                torn = file.seek(0, os.SEEK_END) > valid_end
+            if torn:
+                # drop the partial line, appends would otherwise continue it
+                os.truncate(self.journal_path, valid_end)
+
+        self.seq = max([snapshot_seq] + [event["seq"] for event in events])
+        self.pending = len(events)
+        return state, events
+
+    def append(self, event: Dict[str, Any]) -> "asyncio.Future[None]":
+        """Assign the next sequence number to an event and queue it for writing.
+
+        The sequence number is assigned synchronously, so callers that update
+        their in-memory state in the same step stay consistent with the journal.
+        """
+        self.seq += 1
+        self.pending += 1
+        event = dict(event, seq=self.seq)
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, self._sync_append, json.dumps(event, separators=(",", ":")))
+
+    def _sync_append(self, line: str) -> None:
+        with self.journal_path.open("a", encoding="utf-8") as file:
+            file.write(line + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def attachment_path(self, name: str) -> Path:
+        """path of a binary file stored alongside the snapshot"""
+        return self.path.with_name(f"{self.path.name}.{name}")
+
+    async def read_attachment(self, name: str) -> Optional[bytes]:
+        """read a binary file written by compact, None if it doesn't exist"""
+        path = self.attachment_path(name)
+        return await self._run(lambda: path.read_bytes() if path.exists() else None)
+
+    def compact(self, state: Any, attachments: Optional[Dict[str, bytes]] = None) -> "asyncio.Future[None]":
+        """Queue writing state as the new snapshot and truncating the journal.
+
+        state must contain every event appended so far. attachments are
+        written before the snapshot, so the snapshot never references data
+        that isn't on disk yet.
+        """
+        snapshot = {"seq": self.seq, "state": state}
+        self.pending = 0
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, self._sync_compact, snapshot, attachments or {})
+
+    def _atomic_write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                "wb", dir=path.parent, prefix=path.name, suffix=".tmp", delete=False) as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(file.name, path)
+
+    def _sync_compact(self, snapshot: Dict[str, Any], attachments: Dict[str, bytes]) -> None:
+        for name, data in attachments.items():
+            self._atomic_write(self.attachment_path(name), data)
+        self._atomic_write(self.path, self.serializer.dumps(snapshot))
+
+        # the snapshot is durable, events up to its seq are no longer needed
+        with self.journal_path.open("w", encoding="utf-8") as file:
+            file.flush()
+            os.fsync(file.fileno())
+
+    async def close(self) -> None:
+        """wait for queued writes and stop the worker thread"""
+        await self._run(lambda: None)
+        self._executor.shutdown(wait=True)
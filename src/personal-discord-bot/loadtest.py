@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+loadtest.py
+
+Load test for the HuggingFace cog's request path against the local stub
+server. Reports throughput and tail latency, e.g.:
+
+python -m personal-discord-bot.loadtest --requests 2000 --concurrency 50
+"""
+
+# Standard library imports
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from types import SimpleNamespace
+from typing import List
+
+# Local application imports
+from .config import CogConfig
+from .huggingface import HuggingFace
+from .logger import LoggingMiddleware
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """nearest-rank percentile of already sorted samples"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+async def run(args: argparse.Namespace) -> None:
+    """drive the cog with a fixed number of requests at a fixed concurrency"""
+    config = CogConfig("huggingface", {
+        "enabled": True,
+        "backend": "stub",
+        "stub": {
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "payload_size": args.payload_size,
+            "cold_start": args.cold_start,
+        },
+        "text_to_text": {"enabled": True, "model": "stub/text"},
+        "text_to_image": {"enabled": True, "model": "stub/image"},
+        "cold_start": {"max_retries": 5, "max_wait": 5, "base_backoff": 0.1},
+    })
+
+    # the cog only needs a logger outside of a running bot
+    bot = SimpleNamespace(logger=logging.getLogger("loadtest"))
+    cog = HuggingFace(bot, config)  # type: ignore
+    cog.logger = LoggingMiddleware(bot)  # type: ignore
+    await cog.backend.start()
+
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+
+    async def worker() -> None:
+        nonlocal errors
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            if args.image:
+                ok = await cog.generate_image("a cat riding a bike") is not None
+            else:
+                ok = not (await cog.generate_response("hello there", max_tokens=args.payload_size)).startswith(
+                    ("Sorry", "Oops", "Hmm", "The AI model"))
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    await cog.backend.close()
+
+    latencies.sort()
+    print(f"requests:    {len(latencies)} ({errors} errors) in {elapsed:.2f}s")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s at concurrency {args.concurrency}")
+    print(f"latency ms:  mean {statistics.fmean(latencies) * 1000:.1f}  "
+          f"p50 {percentile(latencies, 50) * 1000:.1f}  "
+          f"p95 {percentile(latencies, 95) * 1000:.1f}  "
+          f"p99 {percentile(latencies, 99) * 1000:.1f}  "
+          f"max {latencies[-1] * 1000:.1f}")
+    for model, entry in cog.stats.items():
+        print(f"{model}: {int(entry['cold_starts'])} cold starts, {entry['cold_latency']:.2f}s added latency")
+
+
+def main() -> None:
+    """parse arguments and run the load test"""
+    parser = argparse.ArgumentParser(description="Load test the HuggingFace cog against a local stub server.")
+    parser.add_argument("--requests", type=int, default=1000, help="total number of requests")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="stub latency jitter in seconds")
+    parser.add_argument("--payload-size", type=int, default=512, help="characters per text response")
+    parser.add_argument("--cold-start", type=float, default=0.0, help="seconds the stub model stays 'loading'")
+    parser.add_argument("--image", action="store_true", help="exercise generate_image instead of generate_response")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
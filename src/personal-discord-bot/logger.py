@@ -3,10 +3,19 @@
 logger.py
 """
 # Standard library imports
+import bisect
+import time
 from logging import Logger
-from typing import TYPE_CHECKING, Any
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 # Third-party library imports
+import discord
 from discord.ext import commands
 
 # Conditional imports for type checking
@@ -16,12 +25,57 @@ else:
     MyBot = Any
 
 
+# upper bounds in ms of the latency buckets, the last bucket catches everything slower
+BUCKETS_MS: List[float] = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+
+class LatencyHistogram:
+    """fixed-bucket histogram, constant memory and an O(log buckets) record"""
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(BUCKETS_MS) + 1)
+        self.total: int = 0
+        self.max_ms: float = 0.0
+
+    def record(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.total += 1
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """upper bound of the bucket containing the q-th percentile (the maximum for the last bucket)"""
+        rank = q / 100 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max_ms
+        return 0.0
+
+
+def _memory_report() -> str:
+    """current and peak resident memory of the process, where the platform tells"""
+    current: Optional[float] = None
+    statm = Path("/proc/self/statm")
+    if statm.exists() and resource is not None:
+        current = int(statm.read_text().split()[1]) * resource.getpagesize() / 2**20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource is not None else None
+    parts = []
+    if current is not None:
+        parts.append(f"{current:.0f} MiB")
+    if peak is not None:
+        parts.append(f"peak {peak:.0f} MiB")
+    return ", ".join(parts) or "unknown"
+
+
 class LoggingMiddleware(commands.Cog):
     """Middleware to log commands before invoke, on error and on completion"""
 
     def __init__(self, bot: MyBot) -> None:
         self.bot: MyBot = bot
         self.logger: Logger = bot.logger
+        # (cog, command, outcome) -> latencies, outcome is ok, error or cooldown
+        self.latencies: Dict[Tuple[str, str, str], LatencyHistogram] = {}
 
     @commands.command(name="set", aliases=["setch", "setchannel", "set_ch", "set_channel"], help="Set output channel for specific cog.")
     async def set_channel(self, ctx: commands.Context, cog_name: str) -> None:
@@ -42,6 +96,78 @@ class LoggingMiddleware(commands.Cog):
             f"{cog_name}: dedicated output channel set to (#{ctx.channel},{ctx.channel.id})!")
         # await ctx.send(f'Dedicated channel has been set to: {channel.name}')
 
+    @commands.command(name="stats", help="Shows command latency percentiles: !stats [cog]")
+    async def command_stats(self, ctx: commands.Context, cog_name: Optional[str] = None) -> None:
+        """admin report of p50/p95/p99 latency per command and outcome, slowest first"""
+
+        if ctx.author.id not in self.bot.bot_admin:
+            await ctx.send('You do not have permission to view the command stats.')
+            return
+
+        rows = [(key, histogram) for key, histogram in self.latencies.items()
+                if cog_name is None or key[0].lower() == cog_name.lower()]
+        if not rows:
+            await ctx.send("No commands recorded yet.")
+            return
+
+        rows.sort(key=lambda row: row[1].percentile(95), reverse=True)
+        lines = [f"{'command':<28}{'outcome':<10}{'n':>6}{'p50':>8}{'p95':>8}{'p99':>8}"]
+        for (cog, command, outcome), histogram in rows[:25]:
+            lines.append(f"{cog + '.' + command:<28.28}{outcome:<10}{histogram.total:>6}"
+                         + "".join(f"{histogram.percentile(q):>8.0f}" for q in (50, 95, 99)))
+        await ctx.send("Latency in ms (bucket upper bounds):\n```\n" + "\n".join(lines) + "\n```")
+
+    def _record(self, ctx: commands.Context, outcome: str) -> None:
+        started = getattr(ctx, "started_at", None)
+        if started is None or ctx.command is None:
+            return
+        key = (ctx.cog.__cog_name__ if ctx.cog else "-", ctx.command.qualified_name, outcome)
+        histogram = self.latencies.get(key)
+        if histogram is None:
+            histogram = self.latencies[key] = LatencyHistogram()
+        histogram.record((time.perf_counter() - started) * 1000)
+
+    @commands.command(name="lag", help="Shows recent event loop lag percentiles.")
+    async def loop_lag(self, ctx: commands.Context) -> None:
+        """admin report of the watchdog's lag measurements"""
+
+        if ctx.author.id not in self.bot.bot_admin:
+            await ctx.send('You do not have permission to view the loop lag.')
+            return
+
+        watchdog = self.bot.watchdog
+        percentiles = watchdog.percentiles()
+        if not percentiles:
+            await ctx.send("No lag measured yet.")
+            return
+        values = ", ".join(f"{name} {ms:.1f} ms" for name, ms in percentiles.items())
+        await ctx.send(f"Event loop lag over the last {len(watchdog.lags)} probes: {values}. "
+                       f"Stalls over {watchdog.threshold * 1000:.0f} ms: {watchdog.stalls}.")
+
+    @commands.command(name="gateway", help="Shows intents, member cache, memory use and gateway event rates.")
+    async def gateway_report(self, ctx: commands.Context) -> None:
+        """admin report to compare intent and cache settings"""
+
+        if ctx.author.id not in self.bot.bot_admin:
+            await ctx.send('You do not have permission to view the gateway report.')
+            return
+
+        uptime = max(time.monotonic() - self.bot.started_at, 1.0)
+        intents = [name for name, enabled in self.bot.intents if enabled]
+        cache = [name for name, enabled in self.bot._connection.member_cache_flags if enabled]
+        total = sum(self.bot.socket_events.values())
+        rates = "\n".join(f"`{event}`: {count / uptime * 60:.1f}/min"
+                          for event, count in self.bot.socket_events.most_common(10))
+
+        embed = discord.Embed(title="Gateway report")
+        embed.add_field(name="Intents", value=", ".join(intents) or "none", inline=False)
+        embed.add_field(name="Member cache", value=", ".join(cache) or "none", inline=True)
+        embed.add_field(name="Chunking", value=str(self.bot._connection._chunk_guilds), inline=True)
+        embed.add_field(name="Cached members", value=str(sum(len(g.members) for g in self.bot.guilds)), inline=True)
+        embed.add_field(name="Memory", value=_memory_report(), inline=True)
+        embed.add_field(name=f"Events ({total / uptime * 60:.1f}/min)", value=rates or "none yet", inline=False)
+        await ctx.send(embed=embed)
+
     async def log_error(self, cog: commands.Cog, message: str) -> None:
         """log error"""
         self.logger.error(cog.__cog_name__ + ": " + message)
@@ -65,11 +191,13 @@ class LoggingMiddleware(commands.Cog):
     @commands.Cog.listener()
     async def on_command_error(self, ctx: commands.Context, error: Exception) -> None:
         """log when command throws error"""
+        self._record(ctx, "cooldown" if isinstance(error, commands.CommandOnCooldown) else "error")
         self.logger.error(f"Error in command {ctx.command}: {error}!")
 
     @commands.Cog.listener()
     async def on_command_completion(self, ctx: commands.Context) -> None:
         """log when command is completed"""
+        self._record(ctx, "ok")
         self.logger.info(
             f"Command completed: {ctx.command} "
             f"by (@{ctx.author},{ctx.author.id}) "
@@ -31,6 +31,9 @@ else:
 class Monitor(BaseCog):
     """monitor user (in-)activity on the server"""
 
+    intents = ("members",)
+    needs_members = True  # walks guild.members for inactivity
+
     def __init__(self, bot: MyBot, config: CogConfig) -> None:
         super().__init__(bot, config)
 
@@ -43,11 +46,18 @@ class Monitor(BaseCog):
         self._roles_to_monitor: List[str] = self._config.roles_to_monitor
         self._roles_inactive: List[str] = self._config.roles_inactive
         self._default_roles: List[str] = self._config.roles_default
-        self._path: Path = self._config.path
+        self._path: Optional[Path] = getattr(self._config, "path", None)  # legacy file, migrated to storage
         self._inactive_message: str = "\n\n".join(
             self._config.inactivity_message)
         self._inactive_message_data: Optional[int] = None
 
+    async def cog_load(self) -> None:
+        await super().cog_load()
+
+        async def store(data: Any) -> None:
+            await self.storage.set("inactive_message_id", data)
+        await self.migrate_file_to_storage(self._path, store)
+
     async def _get_roles_by_name(self, roles_as_list: List[str]) -> List:
         """returns a list of discord roles"""
         _list_roles = []
@@ -151,8 +161,8 @@ class Monitor(BaseCog):
             await self.logger.log_error(self, "Channel not found.")
             return
 
-        # Load inactive message data (assumed to contain message ID)
-        self._inactive_message_data = await self.load_data_from_file(self._path) or None
+        # Load inactive message ID
+        self._inactive_message_data = await self.storage.get("inactive_message_id")
 
         if not self._inactive_message_data:
             await self.logger.log_warning(self, "No inactive message ID found in data.")
@@ -182,7 +192,7 @@ class Monitor(BaseCog):
         try:
             new_message = await channel.send(self._inactive_message)
             self._inactive_message_data = new_message.id
-            await self.save_data_to_file(self._inactive_message_data, self._path)
+            await self.storage.set("inactive_message_id", self._inactive_message_data)
             await self.logger.log_info(self, f"Created new inactive message with ID {new_message.id}.")
         except discord.HTTPException as e:
             await self.logger.log_error(self, f"Failed to create inactive message: {e}")
@@ -4,16 +4,23 @@ movie cog class
 """
 
 # Standard library imports
+import asyncio
+import re
 import sqlite3
-from sqlite3 import Connection, Cursor
+import time
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Optional
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
 # Third-party imports
+import discord
 from discord.ext import commands
 
 # Local application/library specific imports
 from .basecog import BaseCog
 from .config import CogConfig
+from .moviedb import (SEARCH_PAGE_SIZE, CandidateCache, QueryTimeout, ReadOnlyPool, candidate_build,
+                      fetch_titles, has_candidates, match_title, prepare_candidates, search_query,
+                      search_titles)
+from .moviefeatures import MovieFeatures, build_features, features_path
 
 # Conditional Typing Imports
 if TYPE_CHECKING:
@@ -21,6 +28,15 @@ if TYPE_CHECKING:
 else:
     MyBot = Any
 
+T = TypeVar("T")
+
+# candidate buckets loaded at startup, the default filters of !movie
+PREWARM_GENRES = ["Action", "Comedy", "Drama", "Horror", "Sci-Fi", "Thriller"]
+PREWARM_RATINGS = [4.0, 6.0, 7.0, 8.0]
+
+# '!movie_search star wars #2' shows the second page
+PAGE_SUFFIX = re.compile(r"\s+#(\d+)$")
+
 
 class Movie(BaseCog):
     """movie cog"""
@@ -28,8 +44,33 @@ class Movie(BaseCog):
     def __init__(self, bot: MyBot, config: CogConfig) -> None:
         super().__init__(bot, config)
         self.db_path: Path = self._config.path
-        self.conn: Optional[Connection] = None
-        self.cursor: Optional[Cursor] = None
+        self.pool: Optional[ReadOnlyPool] = None
+        self.features: Optional[MovieFeatures] = None
+        self._features_lock = asyncio.Lock()  # one rebuild at a time
+        self.cache: CandidateCache = CandidateCache(self.db_path)
+        self._pool_size: int = getattr(self._config, "pool_size", 2)
+        self._query_timeout: float = getattr(self._config, "query_timeout", 2.0)
+        self._slow_query: float = getattr(self._config, "slow_query", 0.25)
+        self._similar_count: int = getattr(self._config, "similar_count", 10)
+
+    async def cog_unload(self) -> None:
+        if self.pool is not None:
+            await asyncio.to_thread(self.pool.close)
+            self.pool = None
+        await super().cog_unload()
+
+    async def _query(self, label: str, func: Callable[..., T], *args: Any) -> T:
+        """run a query on the read-only pool and log its duration"""
+        assert self.pool is not None
+        started = time.perf_counter()
+        try:
+            return await self.pool.run(func, *args)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            if elapsed > self._slow_query * 1000:
+                await self.logger.log_warning(self, f"slow query {label}{args}: {elapsed:.1f} ms")
+            else:
+                await self.logger.log_info(self, f"query {label}: {elapsed:.1f} ms")
 
     @commands.command(name="movie", aliases=['movies', 'movie_suggestion'], help="Suggests a Movie: !film [genre] [min. rating] [count]")
     async def suggest_movies(
@@ -56,33 +97,111 @@ class Movie(BaseCog):
             await ctx.send("Top N must be an integer between 0 and 30.")
             return
 
-        if self.conn is None:
+        if self.pool is None:
             await ctx.send("Bot is currently not connected to a database!")
             return
 
-        rating_query = f"""SELECT *
-                        FROM TitleRatings tr
-                        WHERE CAST(tr.averageRating AS REAL) >= {min_rating}
-                        AND CAST(tr.numVotes AS INTEGER) >= 50"""
-
-        movie_query = f"""SELECT *
-                        FROM TitleBasics tb
-                        WHERE (tb.titleType = 'movie' OR tb.titleType = 'tvMovie')
-                        AND tb.genres LIKE '%{genre}%'"""
-
-        sugg_query = f"""SELECT * FROM (SELECT tbo.tconst, tbo.primaryTitle, tro.averageRating
-                        FROM ({movie_query}) tbo
-                        JOIN ({rating_query}) tro ON tbo.tconst = tro.tconst
-                        ORDER BY RANDOM() LIMIT {top_n}) ts ORDER BY ts.averageRating DESC;"""
-
-        self.cursor.execute(sugg_query)
-        results = self.cursor.fetchall()
+        try:
+            results = await self._query("suggest", self.cache.sample, genre, min_rating, top_n)
+        except (QueryTimeout, sqlite3.Error) as e:
+            await self.logger.log_error(self, f"Movie suggestion failed: {e}")
+            await ctx.send("The movie database took too long to answer, please try again.")
+            return
 
         suggestions = "\n".join(
             [f"{row[1]} (Rating: {row[2]}, url: {self._imdb_url(row[0])}/)" for row in results])
 
         await ctx.send(f"Top {top_n} movies in {genre} by rating:\n{suggestions}")
 
+    @commands.command(name="movie_search", help="Searches movie titles: !movie_search <title> [#page]")
+    async def search_movies(self, ctx: commands.Context, *, text: str) -> None:
+        """search titles by (partial) words, best matches and well-known movies first"""
+
+        if self._config.channel_id is None or ctx.channel.id != self._config.channel_id:
+            return  # ignore any commands not in the specific channel
+
+        page = 1
+        match = PAGE_SUFFIX.search(text)
+        if match:
+            page = max(1, int(match.group(1)))
+            text = text[:match.start()]
+
+        if search_query(text) is None:
+            await ctx.send("Please enter part of a movie title.")
+            return
+
+        if self.pool is None:
+            await ctx.send("Bot is currently not connected to a database!")
+            return
+
+        try:
+            results, more = await self._query("search", search_titles, text, page - 1)
+        except (QueryTimeout, sqlite3.Error) as e:
+            await self.logger.log_error(self, f"Movie search failed: {e}")
+            await ctx.send("The movie database took too long to answer, please try again.")
+            return
+
+        if not results:
+            await ctx.send(f"No movies found for '{text}'." if page == 1 else f"No more results for '{text}'.")
+            return
+
+        start = (page - 1) * SEARCH_PAGE_SIZE
+        lines = ""
+        for i, (tconst, title, year, rating, votes) in enumerate(results, start=start):
+            year_text = f" ({year})" if year else ""
+            lines += f"`{i + 1}.` [**{title}**{year_text}]({self._imdb_url(tconst)}/) ⭐ {rating} ({votes} votes)\n"
+
+        footer = f"Viewing page {page}"
+        if more:
+            footer += f", next: !movie_search {text} #{page + 1}"
+        embed = discord.Embed(title=f"Movies matching '{text}'", description=lines).set_footer(text=footer)
+        await ctx.send(embed=embed)
+
+    @commands.command(name="movie_like", help="Recommends movies similar to a title: !movie_like <title>")
+    async def similar_movies(self, ctx: commands.Context, *, title: str) -> None:
+        """recommend movies with similar genres, era, rating and popularity"""
+
+        if self._config.channel_id is None or ctx.channel.id != self._config.channel_id:
+            return  # ignore any commands not in the specific channel
+
+        if self.pool is None:
+            await ctx.send("Bot is currently not connected to a database!")
+            return
+
+        if self.features is None:
+            await ctx.send("Recommendations are not available, the movie feature vectors are missing.")
+            return
+
+        try:
+            if not await self._refresh_features():
+                await ctx.send("Recommendations are not available, the movie feature vectors are missing.")
+                return
+            match = await self._query("match", match_title, title)
+            if match is None:
+                await ctx.send(f"No movie found for '{title}'.")
+                return
+            candidate_id, found_title, year = match
+
+            started = time.perf_counter()
+            similar = await asyncio.to_thread(self.features.similar, candidate_id, self._similar_count)
+            await self.logger.log_info(
+                self, f"similarity search over {len(self.features)} movies: "
+                      f"{(time.perf_counter() - started) * 1000:.1f} ms")
+            results = await self._query("similar", fetch_titles, similar)
+        except (QueryTimeout, sqlite3.Error) as e:
+            await self.logger.log_error(self, f"Movie recommendation failed: {e}")
+            await ctx.send("The movie database took too long to answer, please try again.")
+            return
+
+        lines = ""
+        for i, (tconst, similar_title, similar_year, rating) in enumerate(results, start=1):
+            year_text = f" ({similar_year})" if similar_year else ""
+            lines += f"`{i}.` [**{similar_title}**{year_text}]({self._imdb_url(tconst)}/) ⭐ {rating}\n"
+
+        year_text = f" ({year})" if year else ""
+        embed = discord.Embed(title=f"Movies like {found_title}{year_text}", description=lines or "Nothing similar found.")
+        await ctx.send(embed=embed)
+
     def _check_genre(self, genre: str) -> bool:
         """checks if input genre is in imdb genre list"""
 
@@ -104,10 +223,76 @@ class Movie(BaseCog):
         """execute when ready"""
         await self.bot.wait_until_ready()
         await self.logger.log_info(self, "loaded.")
+        if self.pool is not None:
+            return  # on_ready fires again after reconnects
+        pool = ReadOnlyPool(self.db_path, size=self._pool_size, timeout=self._query_timeout)
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
+            if not await pool.run(has_candidates):
+                await self.logger.log_info(self, "Building movie candidate tables, this may take a while ...")
+                count = await asyncio.to_thread(self._prepare_candidates)
+                await self.logger.log_info(self, f"Built candidate tables with {count} movies.")
+            self.pool = pool
             await self.logger.log_info(self, f"Connection to database {self._config.path} successful.")
+            buckets = await pool.run(
+                self.cache.warm,
+                getattr(self._config, "prewarm_genres", PREWARM_GENRES),
+                getattr(self._config, "prewarm_ratings", PREWARM_RATINGS),
+                timeout=self._query_timeout * 10)
+            await self.logger.log_info(self, f"Pre-warmed {buckets} candidate buckets.")
         except sqlite3.Error as e:
-            self.conn = None
+            await asyncio.to_thread(pool.close)
             await self.logger.log_error(self, f"Error connecting to database {self._config.path}: {e}!")
+            return
+
+        try:
+            self.features = await asyncio.to_thread(self._load_features)
+            await self.logger.log_info(self, f"Mapped feature vectors of {len(self.features)} movies.")
+        except (ValueError, OSError, sqlite3.Error) as e:
+            await self.logger.log_warning(self, f"Movie recommendations disabled: {e}")
+
+    async def _refresh_features(self) -> bool:
+        """Remap the feature vectors if the candidate tables were rebuilt since they were loaded.
+
+        Candidate ids are reassigned by every rebuild (e.g. an IMDb import
+        while the bot is running), so vectors of another build would
+        recommend the wrong movies.
+
+        Returns:
+            bool: False if there are no usable vectors.
+        """
+        async with self._features_lock:
+            if self.features is None:
+                return False
+            if await self._query("build", candidate_build) == self.features.stamp:
+                return True
+            try:
+                self.features = await asyncio.to_thread(self._load_features)
+                await self.logger.log_info(
+                    self, f"Candidate tables changed, remapped {len(self.features)} feature vectors.")
+            except (ValueError, OSError) as e:
+                self.features = None
+                await self.logger.log_warning(self, f"Movie recommendations disabled: {e}")
+                return False
+            return True
+
+    def _load_features(self) -> MovieFeatures:
+        """map the feature file, (re)building it if it is missing or stale (runs in a worker thread)"""
+        path = features_path(self.db_path)
+        conn = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            if path.exists():
+                features = MovieFeatures(path)
+                if features.stamp is not None and features.stamp == candidate_build(conn):
+                    return features
+            build_features(conn, path)
+        finally:
+            conn.close()
+        return MovieFeatures(path)
+
+    def _prepare_candidates(self) -> int:
+        """build the candidate tables on a separate connection (runs in a worker thread)"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            return prepare_candidates(conn)
+        finally:
+            conn.close()
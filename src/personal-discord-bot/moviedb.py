@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+moviedb.py
+
+Precomputed, indexed candidate tables for the Movie cog, built from the
+IMDb TitleBasics and TitleRatings tables.
+"""
+
+# Standard library imports
+import asyncio
+import math
+import random
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# every genre used by IMDb, the position is the bit in Candidates.genres
+GENRES: List[str] = [
+    "Action", "Adult", "Adventure", "Animation", "Biography", "Comedy", "Crime", "Documentary",
+    "Drama", "Family", "Fantasy", "Film-Noir", "Game-Show", "History", "Horror", "Music",
+    "Musical", "Mystery", "News", "Reality-TV", "Romance", "Sci-Fi", "Short", "Sport",
+    "Talk-Show", "Thriller", "War", "Western",
+]
+GENRE_BITS: Dict[str, int] = {genre: bit for bit, genre in enumerate(GENRES)}
+
+MIN_VOTES = 50
+TITLE_TYPES = ("movie", "tvMovie")
+
+SCHEMA = """
+CREATE TABLE Candidates (
+    id INTEGER PRIMARY KEY,
+    tconst TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    originalTitle TEXT,
+    year INTEGER,
+    rating REAL NOT NULL,
+    votes INTEGER NOT NULL,
+    popularity REAL NOT NULL,
+    genres INTEGER NOT NULL
+);
+-- one row per (genre, candidate), ids are contiguous per genre and ordered by rating descending
+CREATE TABLE CandidateGenres (
+    id INTEGER PRIMARY KEY,
+    genre INTEGER NOT NULL,
+    rating REAL NOT NULL,
+    candidate INTEGER NOT NULL REFERENCES Candidates(id)
+);
+CREATE TABLE GenreRanges (
+    genre INTEGER PRIMARY KEY,
+    first_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL
+);
+-- a single row identifying this build, files derived from the ids (feature vectors) record it too
+CREATE TABLE CandidateBuild (
+    stamp INTEGER NOT NULL
+);
+"""
+
+CANDIDATE_TABLES = ("Candidates", "CandidateGenres", "GenreRanges", "CandidateBuild")
+
+INDEXES = """
+CREATE INDEX idx_candidate_genres_rating ON CandidateGenres(genre, rating DESC);
+CREATE INDEX idx_candidates_rating ON Candidates(rating DESC);
+"""
+
+# full-text index over the candidates' titles, prefix indexes make 'term*' queries cheap
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE TitleSearch USING fts5(
+    title, originalTitle,
+    content = 'Candidates', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# bm25 is negative (lower is better), so the bonuses are subtracted
+SEARCH_TITLE_WEIGHTS = (10.0, 5.0)
+SEARCH_RATING_WEIGHT = 0.2
+SEARCH_POPULARITY_WEIGHT = 0.5
+SEARCH_PAGE_SIZE = 10
+
+
+def genre_mask(genres: Optional[str]) -> int:
+    """bitmask for an IMDb genre string like 'Action,Drama'"""
+    mask = 0
+    if genres and genres != "\\N":
+        for genre in genres.split(","):
+            bit = GENRE_BITS.get(genre)
+            if bit is not None:
+                mask |= 1 << bit
+    return mask
+
+
+def has_candidates(conn: sqlite3.Connection) -> bool:
+    """checks if the candidate tables, their build stamp and the search index (created last) exist"""
+    row = conn.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ('CandidateBuild', 'TitleSearch')"
+    ).fetchone()
+    return row[0] == 2
+
+
+def candidate_build(conn: sqlite3.Connection) -> Optional[int]:
+    """stamp of the current candidate tables, changes whenever prepare_candidates reassigns the ids"""
+    try:
+        row = conn.execute("SELECT stamp FROM CandidateBuild").fetchone()
+    except sqlite3.OperationalError:
+        return None  # built before stamps were recorded
+    return row[0] if row is not None else None
+
+
+def _source_rows(conn: sqlite3.Connection) -> Iterator[Tuple[str, str, str, Optional[int], float, int, float, int]]:
+    cursor = conn.execute(
+        f"""SELECT tb.tconst, tb.primaryTitle, tb.originalTitle, tb.startYear, tb.genres,
+                   tr.averageRating, tr.numVotes
+            FROM TitleBasics tb
+            JOIN TitleRatings tr ON tr.tconst = tb.tconst
+            WHERE tb.titleType IN ({", ".join("?" for _ in TITLE_TYPES)})
+            ORDER BY tr.averageRating DESC, tb.tconst""", TITLE_TYPES)
+    for tconst, title, original, year, genres, rating, votes in cursor:
+        votes = int(votes)
+        if votes < MIN_VOTES:
+            continue
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            year = None  # '\\N'
+        yield tconst, title, original, year, float(rating), votes, math.log10(votes), genre_mask(genres)
+
+
+def prepare_candidates(conn: sqlite3.Connection) -> int:
+    """(Re)build the candidate tables from TitleBasics and TitleRatings.
+
+    The new tables are built under temporary names and swapped in within one
+    transaction, so readers always see a complete set. conn must not be
+    inside a transaction (best opened with isolation_level=None).
+
+    Returns:
+        int: The number of candidates.
+    """
+    conn.execute("BEGIN")
+    try:
+        for table in CANDIDATE_TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS new_{table}")
+        for statement in SCHEMA.replace("CREATE TABLE ", "CREATE TABLE new_").replace(
+                "REFERENCES Candidates", "REFERENCES new_Candidates").split(";"):
+            if statement.strip():
+                conn.execute(statement)
+
+        # candidates ordered by rating, so ids double as a global ranking; the
+        # rows are streamed from the already sorted query instead of held in memory
+        conn.executemany(
+            "INSERT INTO new_Candidates (tconst, title, originalTitle, year, rating, votes, popularity, genres) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", _source_rows(conn))
+        count = conn.execute("SELECT COUNT(*) FROM new_Candidates").fetchone()[0]
+
+        for bit in range(len(GENRES)):
+            conn.execute(
+                """INSERT INTO new_CandidateGenres (genre, rating, candidate)
+                   SELECT ?, rating, id FROM new_Candidates WHERE genres & ? ORDER BY rating DESC, id""",
+                (bit, 1 << bit))
+        conn.execute(
+            """INSERT INTO new_GenreRanges (genre, first_id, last_id)
+               SELECT genre, MIN(id), MAX(id) FROM new_CandidateGenres GROUP BY genre""")
+
+        conn.execute("INSERT INTO new_CandidateBuild (stamp) VALUES (?)", (time.time_ns(),))
+
+        conn.execute("DROP TABLE IF EXISTS TitleSearch")
+        for table in CANDIDATE_TABLES:
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"ALTER TABLE new_{table} RENAME TO {table}")
+        for statement in INDEXES.split(";"):
+            if statement.strip():
+                conn.execute(statement.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS"))
+
+        # the search index points at candidate ids, so it is rebuilt with them
+        conn.execute(SEARCH_SCHEMA)
+        conn.execute("INSERT INTO TitleSearch (TitleSearch) VALUES ('rebuild')")
+        conn.execute("INSERT INTO TitleSearch (TitleSearch) VALUES ('optimize')")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("ANALYZE")
+    return count
+
+
+def candidate_range(conn: sqlite3.Connection, genre: str, min_rating: float) -> Optional[Tuple[int, int]]:
+    """CandidateGenres ids [first, last] of a genre with rating >= min_rating, two index lookups"""
+    bit = GENRE_BITS[genre]
+    bounds = conn.execute("SELECT first_id, last_id FROM GenreRanges WHERE genre = ?", (bit,)).fetchone()
+    if bounds is None:
+        return None
+    first_id, last_id = bounds
+
+    # first row below the threshold ends the block of qualifying ids
+    below = conn.execute(
+        """SELECT id FROM CandidateGenres WHERE genre = ? AND rating < ?
+           ORDER BY rating DESC, id LIMIT 1""", (bit, min_rating)).fetchone()
+    if below is not None:
+        last_id = below[0] - 1
+    return (first_id, last_id) if last_id >= first_id else None
+
+
+def fetch_candidates(conn: sqlite3.Connection, ids: Sequence[int]) -> List[Tuple[str, str, float]]:
+    """(tconst, title, rating) for CandidateGenres ids, best rated first"""
+    if not ids:
+        return []
+    return conn.execute(
+        f"""SELECT c.tconst, c.title, c.rating
+            FROM CandidateGenres cg JOIN Candidates c ON c.id = cg.candidate
+            WHERE cg.id IN ({", ".join("?" for _ in ids)})
+            ORDER BY c.rating DESC""", list(ids)).fetchall()
+
+
+def rating_bucket(min_rating: float) -> float:
+    """smallest stored rating (one decimal) that passes min_rating, so equivalent filters share a bucket"""
+    return math.ceil(round(min_rating * 10, 6)) / 10
+
+
+class CandidateCache:
+    """Qualifying CandidateGenres ids per (genre, rating bucket).
+
+    The ids of a bucket are one contiguous block, so they are kept as a
+    range object instead of an array. Entries stay valid until the database
+    changes, detected by the file modification times and the connection's
+    PRAGMA data_version (which changes when another connection commits).
+    Used from the pool's worker threads.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path: Path = Path(path)
+        self.hits: int = 0
+        self.misses: int = 0
+        self._ranges: Dict[Tuple[int, float], range] = {}
+        self._stamp: Tuple[int, ...] = ()
+        self._data_versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _file_stamp(self) -> Tuple[int, ...]:
+        stamp = []
+        for path in (self.path, self.path.with_name(self.path.name + "-wal")):
+            try:
+                stamp.append(path.stat().st_mtime_ns)
+            except FileNotFoundError:
+                stamp.append(0)
+        return tuple(stamp)
+
+    def _validate(self, conn: sqlite3.Connection) -> None:
+        """drop every entry if the database changed since it was cached"""
+        stamp = self._file_stamp()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with self._lock:
+            if stamp != self._stamp or self._data_versions.get(id(conn), data_version) != data_version:
+                self._ranges.clear()
+                self._data_versions.clear()
+                self._stamp = stamp
+            self._data_versions[id(conn)] = data_version
+
+    def ids(self, conn: sqlite3.Connection, genre: str, min_rating: float) -> range:
+        """CandidateGenres ids of a genre with rating >= min_rating"""
+        self._validate(conn)
+        key = (GENRE_BITS[genre], rating_bucket(min_rating))
+        with self._lock:
+            ids = self._ranges.get(key)
+        if ids is not None:
+            self.hits += 1
+            return ids
+        self.misses += 1
+        bounds = candidate_range(conn, genre, key[1])
+        ids = range(bounds[0], bounds[1] + 1) if bounds is not None else range(0)
+        with self._lock:
+            self._ranges[key] = ids
+        return ids
+
+    def sample(self, conn: sqlite3.Connection, genre: str, min_rating: float,
+               top_n: int) -> List[Tuple[str, str, float]]:
+        """random top_n movies of a genre with at least min_rating, one database filter per bucket"""
+        population = self.ids(conn, genre, min_rating)
+        return fetch_candidates(conn, random.sample(population, min(top_n, len(population))))
+
+    def warm(self, conn: sqlite3.Connection, genres: Sequence[str], ratings: Sequence[float]) -> int:
+        """load the given buckets ahead of the first request, returns the number of buckets"""
+        for genre in genres:
+            for min_rating in ratings:
+                self.ids(conn, genre, min_rating)
+        return len(self._ranges)
+
+
+def search_query(text: str) -> Optional[str]:
+    """FTS5 query matching every word of text as a prefix, None if there are no words"""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+_SEARCH_SQL = """SELECT {columns}
+                 FROM TitleSearch
+                 JOIN Candidates c ON c.id = TitleSearch.rowid
+                 WHERE TitleSearch MATCH ?
+                 ORDER BY bm25(TitleSearch, ?, ?) - ? * c.rating - ? * c.popularity
+                 LIMIT ? OFFSET ?"""
+
+
+def _search(conn: sqlite3.Connection, columns: str, query: str, limit: int, offset: int) -> List[Tuple[Any, ...]]:
+    title_weight, original_weight = SEARCH_TITLE_WEIGHTS
+    return conn.execute(
+        _SEARCH_SQL.format(columns=columns),
+        (query, title_weight, original_weight, SEARCH_RATING_WEIGHT, SEARCH_POPULARITY_WEIGHT,
+         limit, offset)).fetchall()
+
+
+def search_titles(conn: sqlite3.Connection, text: str,
+                  page: int = 0) -> Tuple[List[Tuple[str, str, Optional[int], float, int]], bool]:
+    """Search candidate titles, ranked by bm25 combined with rating and votes.
+
+    Returns:
+        Tuple: (tconst, title, year, rating, votes) rows of the page and
+        whether there is a next page.
+    """
+    query = search_query(text)
+    if query is None:
+        return [], False
+    rows = _search(conn, "c.tconst, c.title, c.year, c.rating, c.votes", query,
+                   SEARCH_PAGE_SIZE + 1, page * SEARCH_PAGE_SIZE)
+    return rows[:SEARCH_PAGE_SIZE], len(rows) > SEARCH_PAGE_SIZE
+
+
+def match_title(conn: sqlite3.Connection, text: str) -> Optional[Tuple[int, str, Optional[int]]]:
+    """(candidate id, title, year) of the best search result for text"""
+    query = search_query(text)
+    if query is None:
+        return None
+    rows = _search(conn, "c.id, c.title, c.year", query, 1, 0)
+    return rows[0] if rows else None
+
+
+def fetch_titles(conn: sqlite3.Connection,
+                 candidate_ids: Sequence[int]) -> List[Tuple[str, str, Optional[int], float]]:
+    """(tconst, title, year, rating) of Candidates ids, in the given order"""
+    if not candidate_ids:
+        return []
+    rows = conn.execute(
+        f"""SELECT id, tconst, title, year, rating FROM Candidates
+            WHERE id IN ({", ".join("?" for _ in candidate_ids)})""", list(candidate_ids)).fetchall()
+    by_id = {row[0]: row[1:] for row in rows}
+    return [by_id[candidate] for candidate in candidate_ids if candidate in by_id]
+
+
+class QueryTimeout(Exception):
+    """raised when a query runs longer than its timeout"""
+
+
+class ReadOnlyPool:
+    """read-only SQLite connections on worker threads
+
+    Each worker thread lazily opens its own connection (mode=ro, memory
+    mapped, large page cache), so queries never run on the event loop and
+    never share a cursor. sqlite3's statement cache keeps the parameterized
+    statements prepared per connection.
+    """
+
+    def __init__(self, path: Path, size: int = 2, timeout: float = 2.0,
+                 mmap_size: int = 256 * 1024 * 1024, cache_kib: int = 64 * 1024) -> None:
+        self.path: Path = Path(path)
+        self.timeout: float = timeout
+        self._mmap_size: int = mmap_size
+        self._cache_kib: int = cache_kib
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="movie-db")
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro", uri=True,
+                check_same_thread=False, cached_statements=256)
+            conn.execute(f"PRAGMA mmap_size = {int(self._mmap_size)}")
+            conn.execute(f"PRAGMA cache_size = -{int(self._cache_kib)}")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _call(self, func: Callable[..., T], timeout: float, args: Tuple[Any, ...]) -> T:
+        conn = self._connection()
+        deadline = time.monotonic() + timeout
+        # abort the statement from inside sqlite once the deadline has passed
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        try:
+            return func(conn, *args)
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                raise QueryTimeout(f"query exceeded {timeout:.1f}s") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+
+    async def run(self, func: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        """Run func(conn, *args) on a pooled read-only connection.
+
+        Raises:
+            QueryTimeout: If the query ran longer than timeout (default: the pool's timeout).
+            sqlite3.Error: For any other database error.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._call, func, timeout or self.timeout, args)
+
+    def close(self) -> None:
+        """close all connections, waiting for running queries"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+moviefeatures.py
+
+Compact per-movie feature vectors for "more like this" recommendations.
+The vectors are precomputed from the Candidates table into a .npy file next
+to the database and memory-mapped, so a lookup is one vectorized pass over
+the matrix. Requires the optional 'numpy' package.
+"""
+
+# Standard library imports
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+# Local application imports
+from .moviedb import GENRES, candidate_build
+
+# column layout: one column per genre (the genre part is a unit vector), then the scalars
+DECADE = len(GENRES)
+RATING = DECADE + 1
+POPULARITY = DECADE + 2
+HAS_YEAR = DECADE + 3
+COLUMNS = DECADE + 4
+
+# score = genre cosine - decade distance - rating distance + popularity bonus
+DECADE_WEIGHT = 0.1  # per decade
+RATING_WEIGHT = 1.0  # per 10 rating points
+POPULARITY_WEIGHT = 0.2  # per 6 orders of magnitude of votes
+
+
+def features_path(db_path: Path) -> Path:
+    """res/movies.db -> res/movies.features.npy"""
+    return Path(db_path).with_suffix(".features.npy")
+
+
+def stamp_path(path: Path) -> Path:
+    """res/movies.features.npy -> res/movies.features.json, the build stamp of the matrix"""
+    return Path(path).with_suffix(".json")
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ValueError("Movie recommendations require the numpy package (pip install numpy)")
+
+
+def build_features(conn: sqlite3.Connection, path: Path) -> int:
+    """Compute the feature matrix of all candidates and write it to path.
+
+    Row i belongs to the candidate with id i + 1. The file is replaced
+    atomically, so a mapped old version stays valid for its readers. The
+    stamp of the candidate build is written next to it afterwards, a crash
+    in between leaves a mismatch that triggers a rebuild.
+
+    Returns:
+        int: The number of rows.
+
+    Raises:
+        ValueError: If numpy is not installed.
+    """
+    _require_numpy()
+    # stamp and rows from the same snapshot of the database
+    conn.execute("BEGIN")
+    try:
+        stamp = candidate_build(conn)
+        rows = conn.execute(
+            "SELECT id, genres, COALESCE(year, 0), rating, popularity FROM Candidates ORDER BY id").fetchall()
+    finally:
+        conn.execute("COMMIT")
+    data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+    if len(data) and not np.array_equal(data[:, 0], np.arange(1, len(data) + 1)):
+        raise ValueError("Candidate ids are not contiguous, rebuild the candidate tables")
+
+    matrix = np.zeros((len(data), COLUMNS), dtype=np.float32)
+    masks = data[:, 1].astype(np.uint32)
+    genres = ((masks[:, None] >> np.arange(len(GENRES), dtype=np.uint32)) & 1).astype(np.float32)
+    norms = np.linalg.norm(genres, axis=1, keepdims=True)
+    matrix[:, :DECADE] = np.divide(genres, norms, out=np.zeros_like(genres), where=norms > 0)
+    matrix[:, DECADE] = data[:, 2] / 10
+    matrix[:, RATING] = data[:, 3] / 10
+    matrix[:, POPULARITY] = data[:, 4] / 6
+    matrix[:, HAS_YEAR] = data[:, 2] > 0
+
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "wb") as file:
+        np.save(file, matrix)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+    temp_path = stamp_path(path).with_name(stamp_path(path).name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump({"stamp": stamp}, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, stamp_path(path))
+    return len(matrix)
+
+
+class MovieFeatures:
+    """memory-mapped feature matrix with a vectorized similarity search"""
+
+    def __init__(self, path: Path) -> None:
+        """
+        Raises:
+            ValueError: If numpy is not installed or the file is not a feature matrix.
+            OSError: If the file can't be read.
+        """
+        _require_numpy()
+        self.path: Path = path
+        self.matrix: Any = np.load(path, mmap_mode="r")
+        if self.matrix.ndim != 2 or self.matrix.shape[1] != COLUMNS:
+            raise ValueError(f"{path} is not a movie feature file")
+        self.stamp: Optional[int] = self._read_stamp()
+
+    def _read_stamp(self) -> Optional[int]:
+        """candidate build the matrix was computed from, None if unknown"""
+        try:
+            with open(stamp_path(self.path), encoding="utf-8") as file:
+                return json.load(file).get("stamp")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def __len__(self) -> int:
+        return int(self.matrix.shape[0])
+
+    def similar(self, candidate_id: int, count: int = 10) -> List[int]:
+        """candidate ids of the count movies most similar to candidate_id, best first"""
+        index = candidate_id - 1
+        if not 0 <= index < len(self) or count <= 0:
+            return []
+        matrix = self.matrix
+        query = np.array(matrix[index])
+
+        scores = matrix[:, :DECADE] @ query[:DECADE]
+        both_years = matrix[:, HAS_YEAR] * query[HAS_YEAR]
+        scores -= DECADE_WEIGHT * np.abs(matrix[:, DECADE] - query[DECADE]) * both_years
+        scores -= RATING_WEIGHT * np.abs(matrix[:, RATING] - query[RATING])
+        scores += POPULARITY_WEIGHT * matrix[:, POPULARITY]
+        scores[index] = -np.inf
+
+        count = min(count, len(scores) - 1)
+        if count <= 0:
+            return []
+        best = np.argpartition(-scores, count - 1)[:count]
+        best = best[np.argsort(-scores[best])]
+        return [int(i) + 1 for i in best]
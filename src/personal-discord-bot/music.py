@@ -304,6 +304,8 @@ class VoiceState:
 
 
 class Music(BaseCog):
+    intents = ("voice_states",)
+
     def __init__(self, bot: MyBot, config: CogConfig) -> None:
         super().__init__(bot, config)
         self.voice_states = {}
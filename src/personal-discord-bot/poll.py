@@ -8,16 +8,20 @@ poll cog class
 # Standard library imports
 import asyncio
 import random
-from typing import TYPE_CHECKING, Any, List
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 # Third-party imports
 import discord
+from discord import RawReactionActionEvent
 from discord.ext import commands
 
 # Local application imports
 from .basecog import BaseCog
 from .config import CogConfig
 from .logger import LoggingMiddleware
+from .scheduler import DeadlineScheduler
 
 # Conditional typing imports
 if TYPE_CHECKING:
@@ -25,14 +29,29 @@ if TYPE_CHECKING:
 else:
     MyBot = Any
 
+EMOJIS = ['1️⃣', '2️⃣', '3️⃣', '4️⃣', '5️⃣', '6️⃣', '7️⃣', '8️⃣', '9️⃣', '🔟']
+
 
 class Poll(BaseCog):
     "Simple Poll Class"
 
+    intents = ("guild_reactions",)
+
     def __init__(self, bot: MyBot, config: CogConfig) -> None:
         super().__init__(bot, config)
         self._lot_entries: List[str] = []
-        self.cooldown: bool = False
+        self.scheduler: Optional[DeadlineScheduler] = None
+        self.polls: Dict[int, PollState] = {}
+        self._edit_tasks: Dict[int, asyncio.Task] = {}
+        self._edit_delay: float = getattr(self._config, "edit_delay", 2.0)
+        self._votes_table: str = self.storage.table("votes")
+
+    async def cog_unload(self) -> None:
+        if self.scheduler is not None:
+            await self.scheduler.stop()
+        for task in self._edit_tasks.values():
+            task.cancel()
+        await super().cog_unload()
 
     @commands.command(name='lot', aliases=["enter_lot", "enterlot"], help="Enter a lot for polling: !lot [entry] [optional: print_reply]")
     async def enter_lot(self, ctx: commands.Context, entry: str, print_reply: bool = False) -> None:
@@ -66,11 +85,8 @@ class Poll(BaseCog):
         await ctx.send(f"And the winner is: {winning_lot[1]}, congratulations {winning_lot[0].mention}!")
         self._lot_entries.clear()
 
-    async def start_cooldown(self) -> None:
-        await asyncio.sleep(60)
-        self.cooldown = False
-
     @commands.command(name="poll", aliases=["openpoll"], help="Create a Poll: !poll [question] [duration in min.] [option1] [option2] ...")
+    @commands.cooldown(1, 60, commands.BucketType.user)
     async def open_poll(self, ctx: commands.Context, question: str, timer: int, *options: str) -> None:
         """Create a poll with a specified question, duration, and options."""
 
@@ -90,44 +106,237 @@ class Poll(BaseCog):
             await ctx.send("Polls can have a maximum of 10 options!")
             return
 
-        if not self.cooldown:
-            self.cooldown = True
-        else:
+        if self.scheduler is None:
+            await ctx.send("Polls are not available yet, please try again in a moment.")
             return
 
-        poll_embed = discord.Embed(
-            title=f"Poll: {question}", description="", color=0x00ff00)
-        emojis = ['1️⃣', '2️⃣', '3️⃣', '4️⃣',
-                  '5️⃣', '6️⃣', '7️⃣', '8️⃣', '9️⃣', '🔟']
-
-        for i, option in enumerate(options):
-            poll_embed.add_field(
-                name=f"Option {i+1}", value=f"{emojis[i]} {option}", inline=False)
+        state = PollState(ctx.channel.id, 0, question, list(options), time.time() + timer * 60)
+        poll_message = await ctx.send(embed=state.embed())
+        state.message_id = poll_message.id
+        self.polls[poll_message.id] = state
 
-        poll_message = await ctx.send(embed=poll_embed)
+        # the deadline is stored before the reactions are added, so a restart can't lose the poll
+        await self.scheduler.schedule(str(poll_message.id), state.deadline, state.to_dict())
 
         for i in range(len(options)):
-            await poll_message.add_reaction(emojis[i])
-
-        await asyncio.sleep(timer*60)
+            await poll_message.add_reaction(EMOJIS[i])
 
-        poll_message = await ctx.channel.fetch_message(poll_message.id)
-        results = {emojis[i]: 0 for i in range(len(options))}
+    async def close_poll(self, key: str, poll: Dict[str, Any]) -> None:
+        """post the results of a poll whose deadline has passed, from the live tally
 
-        for reaction in poll_message.reactions:
-            if reaction.emoji in results:
-                results[reaction.emoji] = reaction.count - 1
+        Polls that were overdue at startup were resynced with their reactions first.
+        """
+        state = self.polls.pop(poll["message_id"], None) or PollState.from_dict(poll)
+        edit_task = self._edit_tasks.pop(state.message_id, None)
+        if edit_task is not None:
+            edit_task.cancel()
 
+        channel = self.bot.get_partial_messageable(state.channel_id)
         results_embed = discord.Embed(
-            title=f"Poll Results: {question}", description="", color=0x00ff00)
+            title=f"Poll Results: {state.question}", description="", color=0x00ff00)
+        for option, count in zip(state.options, state.counts):
+            results_embed.add_field(name=f"{option}", value=f"{count} votes", inline=False)
+
+        try:
+            await channel.get_partial_message(state.message_id).edit(embed=state.embed(closed=True))
+            await channel.send(embed=results_embed)
+        except discord.HTTPException as e:
+            await self.logger.log_warning(self, f"Could not post the results of poll {key}: {e}")
+        await self.storage.execute(f"DELETE FROM {self._votes_table} WHERE message_id = ?", (state.message_id,))
+
+    def _option(self, payload: RawReactionActionEvent) -> Optional[Tuple["PollState", int]]:
+        """the open poll and option index a reaction event refers to, None for anything else"""
+        state = self.polls.get(payload.message_id)
+        if state is None or payload.user_id == self.bot.user.id:
+            return None
+        if payload.member is not None and payload.member.bot:
+            return None  # bots don't vote, the same rule as in _resync_votes
+        emoji = str(payload.emoji)
+        if emoji not in EMOJIS[:len(state.options)]:
+            return None
+        return state, EMOJIS.index(emoji)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: RawReactionActionEvent) -> None:
+        """count a vote, a user's previous vote in the same poll is replaced"""
+        found = self._option(payload)
+        if found is None:
+            return
+        state, option = found
+        previous = state.vote(payload.user_id, option)
+        if previous == option:
+            return
+        self._schedule_edit(state)
+        await self.storage.execute(
+            f"INSERT INTO {self._votes_table} (message_id, user_id, option) VALUES (?, ?, ?) "
+            "ON CONFLICT (message_id, user_id) DO UPDATE SET option = excluded.option",
+            (state.message_id, payload.user_id, option))
+
+        if previous is not None:
+            # the resulting remove event is ignored, the vote already moved on
+            message = self.bot.get_partial_messageable(state.channel_id).get_partial_message(state.message_id)
+            try:
+                await message.remove_reaction(EMOJIS[previous], discord.Object(payload.user_id))
+            except discord.HTTPException:
+                pass  # missing 'Manage Messages', the old reaction just stays visible
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: RawReactionActionEvent) -> None:
+        """withdraw a vote if the removed reaction is the user's current one"""
+        found = self._option(payload)
+        if found is None:
+            return
+        state, option = found
+        if not state.unvote(payload.user_id, option):
+            return
+        self._schedule_edit(state)
+        await self.storage.execute(
+            f"DELETE FROM {self._votes_table} WHERE message_id = ? AND user_id = ?",
+            (state.message_id, payload.user_id))
+
+    def _schedule_edit(self, state: "PollState") -> None:
+        """update the poll message at most once per edit_delay, with the latest counts"""
+        if state.message_id in self._edit_tasks:
+            return
+        self._edit_tasks[state.message_id] = asyncio.create_task(self._edit_later(state))
+
+    async def _edit_later(self, state: "PollState") -> None:
+        await asyncio.sleep(self._edit_delay)
+        self._edit_tasks.pop(state.message_id, None)
+        message = self.bot.get_partial_messageable(state.channel_id).get_partial_message(state.message_id)
+        try:
+            await message.edit(embed=state.embed())
+        except discord.HTTPException as e:
+            await self.logger.log_warning(self, f"Could not update poll {state.message_id}: {e}")
+
+    async def _load_polls(self) -> None:
+        """rebuild the tallies of the open polls, before any deadline can fire"""
+        await self.storage.execute(
+            f"""CREATE TABLE IF NOT EXISTS {self._votes_table} (
+                    message_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    option INTEGER NOT NULL,
+                    PRIMARY KEY (message_id, user_id)
+                ) WITHOUT ROWID""")
+        for job in (await self.storage.items()).values():
+            state = PollState.from_dict(job["payload"])
+            self.polls[state.message_id] = state
+        for message_id, user_id, option in await self.storage.fetchall(
+                f"SELECT message_id, user_id, option FROM {self._votes_table}"):
+            state = self.polls.get(message_id)
+            if state is not None and option < len(state.options):
+                state.vote(user_id, option)
+        # reactions added or removed while the bot was offline
+        await asyncio.gather(*(self._resync_votes(state) for state in self.polls.values()))
+
+    async def _resync_votes(self, state: "PollState") -> None:
+        """replace a poll's tally with its message's current reactions and store the result"""
+        channel = self.bot.get_partial_messageable(state.channel_id)
+        picks: Dict[int, List[int]] = {}  # user id -> options reacted with, in emoji order
+        try:
+            message = await channel.fetch_message(state.message_id)
+            for reaction in message.reactions:
+                emoji = str(reaction.emoji)
+                if emoji not in EMOJIS[:len(state.options)]:
+                    continue
+                async for user in reaction.users(limit=None):
+                    if not user.bot:
+                        picks.setdefault(user.id, []).append(EMOJIS.index(emoji))
+        except discord.HTTPException as e:
+            await self.logger.log_warning(self, f"Could not read the reactions of poll {state.message_id}, "
+                                                f"keeping the stored votes: {e}")
+            return
 
-        for i, option in enumerate(options):
-            results_embed.add_field(name=f"{option}", value=f"{results[emojis[i]]} votes", inline=False)
+        votes: Dict[int, int] = {}
+        for user_id, options in picks.items():
+            # one vote per user: keep the stored one if it is still there, else the first
+            stored = state.votes.get(user_id)
+            votes[user_id] = stored if stored in options else min(options)
+        removed = [user_id for user_id in state.votes if user_id not in votes]
+        changed = {user_id: option for user_id, option in votes.items() if state.votes.get(user_id) != option}
+        if not removed and not changed:
+            return
 
-        await ctx.send(embed=results_embed)
-        await self.start_cooldown()
+        for user_id in removed:
+            state.unvote(user_id, state.votes[user_id])
+        for user_id, option in changed.items():
+            state.vote(user_id, option)
+        await self.storage.executemany(
+            f"INSERT INTO {self._votes_table} (message_id, user_id, option) VALUES (?, ?, ?) "
+            "ON CONFLICT (message_id, user_id) DO UPDATE SET option = excluded.option",
+            [(state.message_id, user_id, option) for user_id, option in changed.items()])
+        await self.storage.executemany(
+            f"DELETE FROM {self._votes_table} WHERE message_id = ? AND user_id = ?",
+            [(state.message_id, user_id) for user_id in removed])
+        self._schedule_edit(state)
+        await self.logger.log_info(
+            self, f"Poll {state.message_id}: counted {len(changed)} new or changed and "
+                  f"{len(removed)} withdrawn votes from while the bot was offline.")
 
     @commands.Cog.listener()
     async def on_ready(self):
         await self.bot.wait_until_ready()
         await self.logger.log_info(self, "loaded.")
+        if self.scheduler is not None:
+            return  # on_ready fires again after reconnects
+        await self._load_polls()
+        scheduler = DeadlineScheduler(self.storage, self.close_poll)
+        await scheduler.start()
+        self.scheduler = scheduler
+        await self.logger.log_info(self, f"Resumed {len(self.scheduler)} open polls.")
+
+
+class PollState:
+    """an open poll and its live tally, one vote per user"""
+
+    def __init__(self, channel_id: int, message_id: int, question: str, options: List[str],
+                 deadline: float) -> None:
+        self.channel_id: int = channel_id
+        self.message_id: int = message_id
+        self.question: str = question
+        self.options: List[str] = options
+        self.deadline: float = deadline
+        self.votes: Dict[int, int] = {}
+        self.counts: List[int] = [0] * len(options)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "channel_id": self.channel_id,
+            "message_id": self.message_id,
+            "question": self.question,
+            "options": self.options,
+            "deadline": self.deadline,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PollState":
+        return cls(data["channel_id"], data["message_id"], data["question"], data["options"],
+                   data.get("deadline", time.time()))
+
+    def vote(self, user_id: int, option: int) -> Optional[int]:
+        """set a user's vote, returns their previous option"""
+        previous = self.votes.get(user_id)
+        if previous != option:
+            if previous is not None:
+                self.counts[previous] -= 1
+            self.votes[user_id] = option
+            self.counts[option] += 1
+        return previous
+
+    def unvote(self, user_id: int, option: int) -> bool:
+        """withdraw a user's vote if it is for option"""
+        if self.votes.get(user_id) != option:
+            return False
+        del self.votes[user_id]
+        self.counts[option] -= 1
+        return True
+
+    def embed(self, closed: bool = False) -> discord.Embed:
+        poll_embed = discord.Embed(
+            title=f"Poll: {self.question}", description="", color=0x00ff00,
+            timestamp=datetime.fromtimestamp(self.deadline, timezone.utc))
+        poll_embed.set_footer(text=f"{len(self.votes)} votes · {'Closed' if closed else 'Closes'}")
+        for i, option in enumerate(self.options):
+            poll_embed.add_field(
+                name=f"Option {i+1}", value=f"{EMOJIS[i]} {option} — {self.counts[i]} votes", inline=False)
+        return poll_embed
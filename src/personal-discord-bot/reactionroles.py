@@ -4,7 +4,9 @@ reaction roles cog class
 """
 
 # Standard library imports
-from typing import TYPE_CHECKING, Any, Dict, Optional
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Set, Tuple, Union
 
 # Third-party library imports
 import discord
@@ -14,6 +16,7 @@ from discord.ext import commands
 # Local application imports
 from .basecog import BaseCog
 from .config import CogConfig
+from .serialization import id_keys
 
 # Conditional imports for type checking
 if TYPE_CHECKING:
@@ -22,73 +25,258 @@ else:
     MyBot = Any
 
 
+class RoleBinding(NamedTuple):
+    role_id: int
+    group: int  # the message id, exclusive roles are exclusive per message
+    exclusive: bool
+
+
+def emoji_key(emoji: Union[str, discord.PartialEmoji, discord.Emoji]) -> str:
+    """Normalized lookup key of an emoji.
+
+    Custom emoji are keyed by id (their name may change), unicode emoji by
+    the character without variation selectors, so '🎞️' and '🎞' match.
+    """
+    if isinstance(emoji, str):
+        emoji = discord.PartialEmoji.from_str(emoji)
+    if emoji.id:
+        return str(emoji.id)
+    return emoji.name.replace("\ufe0f", "")
+
+
+def compile_bindings(message_data: Dict[int, Dict[str, Any]], guild: discord.Guild) -> Tuple[
+        Dict[Tuple[int, str], RoleBinding], Dict[int, Dict[int, str]], List[str]]:
+    """Flatten the reaction role messages into a lookup table.
+
+    Returns:
+        Tuple: (message id, emoji key) -> RoleBinding, group -> {role id:
+        emoji} of the group, and the names of roles that don't exist in the guild.
+    """
+    roles_by_name = {role.name: role for role in guild.roles}
+    bindings: Dict[Tuple[int, str], RoleBinding] = {}
+    group_roles: Dict[int, Dict[int, str]] = {}
+    missing: List[str] = []
+    for message_id, entry in message_data.items():
+        exclusive = not entry.get('allow_multiple', True)
+        for emoji, data in entry.get('reactions', {}).items():
+            role = roles_by_name.get(data.get('role'))
+            if role is None:
+                missing.append(str(data.get('role')))
+                continue
+            bindings[(message_id, emoji_key(emoji))] = RoleBinding(role.id, message_id, exclusive)
+            group_roles.setdefault(message_id, {})[role.id] = emoji
+    return bindings, group_roles, missing
+
+
 class ReactionRoles(BaseCog):
+    intents = ("guild_reactions",)
+    needs_members = True  # reconciliation compares role.members
+
     def __init__(self, bot: MyBot, config: CogConfig) -> None:
         super().__init__(bot, config)
         self.message_data: Dict[int, Dict[str, Any]] = {}
+        self.bindings: Dict[Tuple[int, str], RoleBinding] = {}
+        self.group_roles: Dict[int, Dict[int, str]] = {}
+
+        # role changes per (guild id, member id), applied with one member.edit after the debounce delay
+        self._debounce: float = getattr(self._config, "debounce", 1.0)
+        self._pending_roles: Dict[Tuple[int, int], Dict[int, bool]] = {}
+        self._role_tasks: Dict[Tuple[int, int], asyncio.Task] = {}
+
+        # (channel id, message id, emoji, guild id, member id, role id) of reactions that lost to an exclusive pick
+        self._removal_interval: float = getattr(self._config, "removal_interval", 0.5)
+        self._removals: "asyncio.Queue[Tuple[int, int, str, int, int, int]]" = asyncio.Queue()
+        self._queued_removals: Set[Tuple[int, int, str, int, int, int]] = set()
+        self._removal_task: Optional[asyncio.Task] = None
+
+        # messages getting their reactions at the same time during setup
+        self._setup_slots = asyncio.Semaphore(getattr(self._config, "setup_concurrency", 3))
+        self._ready_done: bool = False
+
+        # reconcile() only grants missing roles unless this is set; with it, bound roles
+        # held without a matching reaction (e.g. granted by hand) are removed as well
+        self._reconcile_removals: bool = getattr(self._config, "reconcile_removals", False)
+
+    async def cog_unload(self) -> None:
+        for task in [*self._role_tasks.values(), self._removal_task]:
+            if task is not None:
+                task.cancel()
+        await super().cog_unload()
 
     async def cog_load(self) -> None:
         """Runs when the cog is fully loaded and dependencies are available."""
         await super().cog_load()
-        self.message_data = await self.load_data_from_file(self._config.path) or {}
+        await self.migrate_file_to_storage(getattr(self._config, "path", None), self._store_message_data)
+        self.message_data = id_keys(await self.storage.items())
         if len(self.message_data.keys()) > 0:
             await self.logger.log_info(self, f"Loaded reaction role message IDs: {self.message_data}")
         else:
-            await self.logger.log_warning(self, f"No message IDs found in {self._config.path}")
+            await self.logger.log_warning(self, "No message IDs found in storage")
+
+    async def _store_message_data(self, message_data: Dict[int, Dict[str, Any]]) -> None:
+        """replace the stored messages, one key per message id, in a single write"""
+        message_data = id_keys(message_data)  # a migrated JSON file has string keys
+        stored = await self.storage.items()
+        changed = {message_id: entry for message_id, entry in message_data.items()
+                   if stored.get(str(message_id)) != entry}
+        removed = [key for key in stored if int(key) not in message_data]
+        if changed or removed:
+            await self.storage.update(changed, delete=removed)
+
+    async def rebuild_bindings(self) -> None:
+        """recompile the lookup table, after any change to message_data or the guild's roles"""
+        channel = self.bot.get_channel(self._config.channel_id)
+        if not isinstance(channel, TextChannel):
+            self.bindings, self.group_roles = {}, {}
+            return
+        self.bindings, self.group_roles, missing = compile_bindings(self.message_data, channel.guild)
+        if missing:
+            await self.logger.log_warning(self, f"Roles not found: {', '.join(missing)}")
+
+    async def setup_reaction_messages(self) -> Tuple[Dict[int, discord.Message], int]:
+        """Ensure reaction role messages exist, recreating only the missing ones.
 
-    async def setup_reaction_messages(self) -> None:
-        """Ensure reaction role messages exist."""
+        The stored messages are found with one scan of the channel history,
+        starting at the oldest of them. Missing messages are posted in config
+        order, their reactions are then added concurrently.
 
+        Returns:
+            Tuple: The existing messages by id, for reconciliation, and the
+            number of API calls made.
+        """
         channel: Optional[TextChannel] = await self.get_text_channel(self._config.channel_id)
         if not channel:
-            return
+            return {}, 0
+
+        messages: Dict[int, discord.Message] = {}
+        api_calls = 0
+        if self.message_data:
+            wanted = set(self.message_data)
+            scanned = 0
+            async for message in channel.history(
+                    limit=None, after=discord.Object(id=min(wanted) - 1), oldest_first=True):
+                scanned += 1
+                if message.id in wanted:
+                    messages[message.id] = message
+                    if len(messages) == len(wanted):
+                        break
+            api_calls += scanned // 100 + 1  # history is fetched in pages of 100
+
+        missing = [(message_id, entry) for message_id, entry in self.message_data.items()
+                   if message_id not in messages]
+        if not self.message_data:
+            missing = [(None, entry) for entry in self._config.messages]
+
+        created: List[Tuple[int, Dict[str, Any]]] = []
+        for message_id, entry in missing:
+            if message_id is not None:
+                await self.logger.log_warning(self, f"Message {message_id} not found, creating a new one.")
+                del self.message_data[message_id]
+            new_id = await self.create_reaction_message(channel, entry, add_reactions=False)
+            api_calls += 1
+            if new_id:
+                created.append((new_id, entry))
+
+        await asyncio.gather(*(
+            self.add_reactions(channel.get_partial_message(new_id), entry) for new_id, entry in created))
+        api_calls += sum(len(entry.get('reactions', {})) for _, entry in created)
+
+        if missing:
+            # Save the new message IDs
+            await self._store_message_data(self.message_data)
+
+        await self.rebuild_bindings()
+        return messages, api_calls
 
-        all_messages_available = True if self.message_data else False
+    async def reconcile(self, messages: Dict[int, discord.Message], api_calls: int = 0) -> None:
+        """Catch up on reactions added while the bot was offline.
 
-        # Check if stored messages still exist
-        for message_id in self.message_data.keys():
+        The users of every tracked reaction are paged through once and
+        compared with the members holding its role; missing roles are granted,
+        with one role edit per affected member. Roles held without a reaction
+        are only removed if reconcile_removals is set, they may have been
+        granted by hand. A message whose reactions can't be read is skipped.
+
+        :param api_calls: Calls made before, e.g. by setup_reaction_messages, for the report
+        """
+        started = time.perf_counter()
+        reactors: Dict[Tuple[int, int], List[int]] = {}  # (message id, member id) -> reacted role ids
+        guild: Optional[discord.Guild] = None
+
+        read: Set[int] = set()  # messages whose reactions were all read
+        for message_id, message in messages.items():
+            guild = message.guild
+            found: Dict[Tuple[int, int], List[int]] = {}
             try:
-                await channel.fetch_message(message_id)
-            except discord.NotFound:
-                await self.logger.log_warning(self, f"Message {message_id} not found, creating a new one.")
-                all_messages_available = False
-
-        # If any messages are missing or never existed, recreate them
-        if not all_messages_available:
-            for message_id in self.message_data.keys():
-                try:
-                    message = await channel.fetch_message(message_id)
-                    await message.delete()
-                    await self.logger.log_info(self, f"Deleted orphaned message {message_id}.")
-                except (discord.NotFound, discord.HTTPException):
-                    # Ignore if already gone or if deletion fails
-                    pass
-
-            # Clear the old message IDs
-            self.message_data = {}
-
-            # Create new reaction role messages
-            for entry in self._config.messages:
-                message_id = await self.create_reaction_message(channel, entry)
-                if message_id
-                    self.message_data[message_id] = entry
-
-            # Save the new message IDs to file
-            await self.save_data_to_file(self.message_data, self._config.path)
-
-    async def create_reaction_message(self, channel: TextChannel, entry: Dict[str, Any]) -> int:
+                for reaction in message.reactions:
+                    binding = self.bindings.get((message_id, emoji_key(reaction.emoji)))
+                    if binding is None:
+                        continue
+                    count = 0
+                    async for user in reaction.users(limit=None):
+                        count += 1
+                        if not user.bot:
+                            found.setdefault((message_id, user.id), []).append(binding.role_id)
+                    api_calls += count // 100 + 1  # users are fetched in pages of 100
+            except discord.HTTPException as e:
+                # deleted meanwhile or missing permissions: leave this message's roles alone
+                await self.logger.log_warning(self, f"Could not read the reactions of message {message_id}: {e}")
+                continue
+            reactors.update(found)
+            read.add(message_id)
+
+        if guild is None:
+            return
+
+        changes: Dict[int, Dict[int, bool]] = {}
+        wanted: Dict[int, Set[int]] = {}
+        for (message_id, member_id), role_ids in reactors.items():
+            member = guild.get_member(member_id)
+            if member is None:
+                continue
+            if len(role_ids) > 1 and not self.message_data[message_id].get('allow_multiple', True):
+                # several picks in an exclusive group: keep the one held, else the first
+                held = [role_id for role_id in role_ids if member.get_role(role_id) is not None]
+                role_ids = held[:1] or role_ids[:1]
+            wanted.setdefault(member_id, set()).update(role_ids)
+
+        # messages created just now have no reactions yet, their roles are left alone
+        for group, roles in self.group_roles.items():
+            if group not in read:
+                continue
+            for role_id in roles:
+                role = guild.get_role(role_id)
+                if role is None:
+                    continue
+                holders = {member.id for member in role.members if not member.bot}
+                reacted = {member_id for member_id, role_ids in wanted.items() if role_id in role_ids}
+                for member_id in reacted - holders:
+                    changes.setdefault(member_id, {})[role_id] = True
+                if self._reconcile_removals:
+                    for member_id in holders - reacted:
+                        changes.setdefault(member_id, {})[role_id] = False
+
+        edits = 0
+        for member_id, member_changes in changes.items():
+            member = guild.get_member(member_id)
+            if member is not None and await self._edit_roles(guild, member, member_changes):
+                edits += 1
+
+        await self.logger.log_info(
+            self, f"Reconciled reaction roles in {time.perf_counter() - started:.1f}s: "
+                  f"{edits} members updated, {api_calls + edits} API calls.")
+
+    async def create_reaction_message(self, channel: TextChannel, entry: Dict[str, Any],
+                                      add_reactions: bool = True) -> Optional[int]:
         """Creates a reaction role message and returns its ID.
 
         Args:
             channel: The TextChannel where the message will be sent.
             entry: Dictionary containing message details (text, reactions, etc.).
+            add_reactions: Also add the reactions, otherwise that's left to add_reactions().
 
         Returns:
-            int: The ID of the created message.
-
-        Raises:
-            discord.Forbidden: If the bot lacks permissions to send messages or add reactions.
-            discord.HTTPException: If sending the message or adding reactions fails.
+            Optional[int]: The ID of the created message, None if it couldn't be sent.
         """
         # Create embed with reaction role information
         embed = Embed(
@@ -108,118 +296,173 @@ class ReactionRoles(BaseCog):
                 inline=False
             )
 
-        # Send message and add reactions
+        # Send message
         try:
             bot_message = await channel.send(embed=embed)
-            for emoji in reactions:
-                await bot_message.add_reaction(emoji)
         except discord.Forbidden as e:
             await self.logger.log_error(self, f"Bot lacks permissions in channel {channel.id}: {str(e)}")
+            return None
         except discord.HTTPException as e:
             await self.logger.log_error(self, f"Failed to create reaction message: {str(e)}")
+            return None
 
         # Store the message ID in self.message_data if not already present
         if bot_message.id not in self.message_data:
             self.message_data[bot_message.id] = entry
 
+        if add_reactions:
+            await self.add_reactions(bot_message, entry)
         return bot_message.id
 
-    @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload: RawReactionActionEvent) -> None:
-        if payload.message_id not in self.message_data:
-            return
+    async def add_reactions(self, message: Union[discord.Message, discord.PartialMessage],
+                            entry: Dict[str, Any]) -> None:
+        """add an entry's reactions in order, at most setup_concurrency messages at a time"""
+        async with self._setup_slots:
+            try:
+                for emoji in entry.get('reactions', {}):
+                    await message.add_reaction(emoji)
+            except discord.Forbidden as e:
+                await self.logger.log_error(self, f"Bot lacks permissions to add reactions: {str(e)}")
+            except discord.HTTPException as e:
+                await self.logger.log_error(self, f"Failed to add reactions to {message.id}: {str(e)}")
+
+    def _resolve(self, payload: RawReactionActionEvent) -> Optional[Tuple[
+            RoleBinding, discord.Guild, discord.Member, discord.Role]]:
+        """binding, guild, member and role of a reaction event, None if it is not a reaction role"""
+        binding = self.bindings.get((payload.message_id, emoji_key(payload.emoji)))
+        if binding is None:
+            return None
 
         guild = self.bot.get_guild(payload.guild_id)
         if not guild:
-            return
+            return None
 
-        member = guild.get_member(payload.user_id)
+        member = payload.member or guild.get_member(payload.user_id)
         if not member or member.bot:
-            return
+            return None
 
-        message_config = self.message_data[payload.message_id]
-        emoji = str(payload.emoji)
-
-        reaction_roles = message_config.get('reactions', {})
-        role_data = reaction_roles.get(emoji)
-        if not role_data or 'role' not in role_data:
-            return
-
-        # Get and assign role
-        role_name = role_data['role']
-        role = discord.utils.get(guild.roles, name=role_name)
+        role = guild.get_role(binding.role_id)
         if not role or role >= guild.me.top_role:
-            return
-
-        try:
-            if not message_config.get('allow_multiple', True):
-                # Get the message object to manage reactions
-                channel = guild.get_channel(payload.channel_id)
-                if not channel:
-                    return
-                message = await channel.fetch_message(payload.message_id)
-
-                # Remove existing roles and their corresponding reactions
-                roles_to_remove = []
-                reactions_to_remove = []
-                for existing_emoji, data in reaction_roles.items():
-                    if existing_emoji != emoji:
-                        existing_role = discord.utils.get(
-                            guild.roles, name=data['role'])
-                        if existing_role in member.roles:
-                            roles_to_remove.append(existing_role)
-                            reactions_to_remove.append(existing_emoji)
-
-                # Remove roles from member
-                if roles_to_remove:
-                    await member.remove_roles(*roles_to_remove, reason="Exclusive reaction role cleanup")
-
-                # Remove other reactions from the message for this user
-                for reaction_emoji in reactions_to_remove:
-                    reaction = discord.utils.get(
-                        message.reactions, emoji=reaction_emoji)
-                    if reaction:
-                        await reaction.remove(member)
-
-            # Add the new role
-            await member.add_roles(role, reason="Reaction role assignment")
+            return None
+        return binding, guild, member, role
 
-        except discord.Forbidden:
-            await self.logger.log_error(self, f"Bot lacks permissions to assign role {role_name}.")
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: RawReactionActionEvent) -> None:
+        resolved = self._resolve(payload)
+        if resolved is None:
+            return
+        binding, guild, member, role = resolved
+
+        changes = {role.id: True}
+        if binding.exclusive:
+            # drop the other roles of the group, held or still pending, and their reactions
+            pending = self._pending_roles.get((guild.id, member.id), {})
+            held = {existing.id for existing in member.roles}
+            for other_id, other_emoji in self.group_roles[binding.group].items():
+                if other_id != role.id and (other_id in held or pending.get(other_id)):
+                    changes[other_id] = False
+                    self._queue_removal(
+                        (payload.channel_id, payload.message_id, other_emoji, guild.id, member.id, other_id))
+        self._queue_roles(guild, member, changes)
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(self, payload: RawReactionActionEvent) -> None:
-
-        if payload.message_id not in self.message_data:
+        resolved = self._resolve(payload)
+        if resolved is None:
             return
+        _, guild, member, role = resolved
+        self._queue_roles(guild, member, {role.id: False})
+
+    def _queue_roles(self, guild: discord.Guild, member: discord.Member, changes: Dict[int, bool]) -> None:
+        """merge role changes into the member's pending state, later reactions win"""
+        key = (guild.id, member.id)
+        self._pending_roles.setdefault(key, {}).update(changes)
+        if key not in self._role_tasks:
+            self._role_tasks[key] = asyncio.create_task(self._apply_roles(key))
+
+    def _wants_role(self, guild_id: int, member_id: int, role_id: int) -> bool:
+        """the member's latest desired state of a role, pending changes first"""
+        pending = self._pending_roles.get((guild_id, member_id), {})
+        if role_id in pending:
+            return pending[role_id]
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(member_id) if guild else None
+        return member is not None and member.get_role(role_id) is not None
+
+    async def _apply_roles(self, key: Tuple[int, int]) -> None:
+        """set the member's final roles with a single edit once their reactions settled"""
+        await asyncio.sleep(self._debounce)
+        self._role_tasks.pop(key, None)
+        changes = self._pending_roles.pop(key, {})
+
+        guild_id, member_id = key
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(member_id) if guild else None
+        if member is not None:
+            await self._edit_roles(guild, member, changes)
+
+    async def _edit_roles(self, guild: discord.Guild, member: discord.Member, changes: Dict[int, bool]) -> bool:
+        """apply role changes with one member.edit, returns False if nothing had to change"""
+        current = {role.id for role in member.roles if not role.is_default()}
+        wanted = {role_id for role_id, add in changes.items() if add}
+        unwanted = {role_id for role_id, add in changes.items() if not add}
+        roles = (current | wanted) - unwanted
+        if roles == current:
+            return False
 
-        guild = self.bot.get_guild(payload.guild_id)
-        if not guild:
-            return
+        try:
+            await member.edit(
+                roles=[role for role_id in roles if (role := guild.get_role(role_id)) is not None],
+                reason="Reaction role assignment")
+        except discord.Forbidden:
+            await self.logger.log_error(self, f"Bot lacks permissions to edit the roles of {member}.")
+        except discord.HTTPException as e:
+            await self.logger.log_error(self, f"Failed to edit the roles of {member}: {e}")
+        return True
 
-        member = guild.get_member(payload.user_id)
-        if not member or member.bot:
+    def _queue_removal(self, removal: Tuple[int, int, str, int, int, int]) -> None:
+        if removal in self._queued_removals:
             return
+        self._queued_removals.add(removal)
+        self._removals.put_nowait(removal)
+        if self._removal_task is None or self._removal_task.done():
+            self._removal_task = asyncio.create_task(self._remove_reactions())
+
+    async def _remove_reactions(self) -> None:
+        """remove the losing reactions of exclusive groups, one call per removal_interval"""
+        while True:
+            removal = await self._removals.get()
+            self._queued_removals.discard(removal)
+            channel_id, message_id, emoji, guild_id, member_id, role_id = removal
+            if self._wants_role(guild_id, member_id, role_id):
+                continue  # the user picked this one again in the meantime
+
+            message = self.bot.get_partial_messageable(channel_id).get_partial_message(message_id)
+            try:
+                await message.remove_reaction(emoji, discord.Object(member_id))
+            except discord.HTTPException:
+                pass  # already gone, or missing 'Manage Messages'
+            await asyncio.sleep(self._removal_interval)
 
-        message_config = self.message_data[payload.message_id]
-        emoji = str(payload.emoji)
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role) -> None:
+        await self.rebuild_bindings()
 
-        reaction_roles = message_config.get('reactions', {})
-        role_data = reaction_roles.get(emoji)
-        if not role_data or 'role' not in role_data:
-            return
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
+        if before.name != after.name:
+            await self.rebuild_bindings()
 
-        # Get and remove role
-        role_name = role_data['role']
-        role = discord.utils.get(guild.roles, name=role_name)
-        if role and role < guild.me.top_role:
-            try:
-                await member.remove_roles(role, reason="Reaction role removal")
-            except discord.Forbidden:
-                pass
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role) -> None:
+        await self.rebuild_bindings()
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         await self.bot.wait_until_ready()
         await self.logger.log_info(self, "loaded.")
-        await self.setup_reaction_messages()
+        if self._ready_done:
+            return  # on_ready fires again after reconnects
+        self._ready_done = True
+        messages, api_calls = await self.setup_reaction_messages()
+        await self.reconcile(messages, api_calls)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+scheduler.py
+
+Persistent deadline scheduler: deadlines are kept in a heap with a single
+loop timer for the earliest one, and stored in the bot's SQLite storage so
+pending jobs resume after a restart.
+"""
+
+# Standard library imports
+import asyncio
+import heapq
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# Local application imports
+from .storage import Namespace
+
+Callback = Callable[[str, Any], Awaitable[None]]
+
+
+class DeadlineScheduler:
+    """Runs callback(key, payload) once the wall-clock deadline of a job has passed.
+
+    A job stays in the store until its callback has finished, so a job whose
+    deadline passed while the bot was down (or that was interrupted) runs
+    right after start().
+    """
+
+    def __init__(self, store: Namespace, callback: Callback) -> None:
+        self._store: Namespace = store
+        self._callback: Callback = callback
+        self._heap: List[Tuple[float, str]] = []
+        self._jobs: Dict[str, Tuple[float, Any]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+        self._started: bool = False
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    async def start(self) -> None:
+        """load the stored jobs and arm the timer"""
+        for key, job in (await self._store.items()).items():
+            self._push(key, job["deadline"], job["payload"])
+        self._started = True
+        self._arm()
+
+    async def stop(self) -> None:
+        """disarm the timer and wait for running callbacks, pending jobs stay stored"""
+        self._started = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def schedule(self, key: str, deadline: float, payload: Any = None) -> None:
+        """Store a job and schedule it, replacing an existing job with the same key.
+
+        :param deadline: Unix timestamp (time.time()) at which the job is due
+        """
+        await self._store.set(key, {"deadline": deadline, "payload": payload})
+        self._push(key, deadline, payload)
+        self._arm()
+
+    async def cancel(self, key: str) -> bool:
+        """remove a pending job, returns False if there is none"""
+        if self._jobs.pop(key, None) is None:
+            return False
+        await self._store.delete(key)
+        self._arm()
+        return True
+
+    def deadline(self, key: str) -> Optional[float]:
+        job = self._jobs.get(key)
+        return job[0] if job is not None else None
+
+    def _push(self, key: str, deadline: float, payload: Any) -> None:
+        # replaced or cancelled jobs leave stale heap entries, skipped when popped
+        self._jobs[key] = (deadline, payload)
+        heapq.heappush(self._heap, (deadline, key))
+
+    def _discard_stale(self) -> None:
+        while self._heap:
+            deadline, key = self._heap[0]
+            job = self._jobs.get(key)
+            if job is not None and job[0] == deadline:
+                return
+            heapq.heappop(self._heap)
+
+    def _arm(self) -> None:
+        """point the single timer at the earliest deadline"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._discard_stale()
+        if not self._started or not self._heap:
+            return
+        delay = max(0.0, self._heap[0][0] - time.time())
+        self._timer = asyncio.get_running_loop().call_later(delay, self._fire)
+
+    def _fire(self) -> None:
+        self._timer = None
+        now = time.time()
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, key = heapq.heappop(self._heap)
+            _, payload = self._jobs.pop(key)
+            task = asyncio.create_task(self._run(key, payload))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        self._arm()
+
+    async def _run(self, key: str, payload: Any) -> None:
+        try:
+            await self._callback(key, payload)
+        finally:
+            # unless the job was scheduled again from inside the callback
+            if key not in self._jobs:
+                await self._store.delete(key)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+serialization.py
+
+Storage formats for cog state files. YAML uses the libyaml C loader and
+dumper when PyYAML was built with it, JSON is always available and msgpack
+is used if the optional 'msgpack' package is installed.
+"""
+
+# Standard library imports
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+# Third-party imports
+import yaml
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+# prefer the C implementations, fall back to pure Python
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+class Serializer(ABC):
+    """converts cog state to bytes and back"""
+
+    name: str = "base"
+
+    @abstractmethod
+    def dumps(self, data: Any) -> bytes:
+        """encode data in this format"""
+
+    @abstractmethod
+    def loads(self, raw: bytes) -> Any:
+        """
+        Raises:
+            ValueError: If raw is not valid for this format.
+        """
+
+
+class YamlSerializer(Serializer):
+    """human-readable, the historical default"""
+
+    name = "yaml"
+
+    def __init__(self, loader: Any = YamlLoader, dumper: Any = YamlDumper) -> None:
+        self.loader = loader
+        self.dumper = dumper
+
+    def dumps(self, data: Any) -> bytes:
+        return yaml.dump(data, Dumper=self.dumper, allow_unicode=True).encode("utf-8")
+
+    def loads(self, raw: bytes) -> Any:
+        try:
+            return yaml.load(raw, Loader=self.loader)  # nosec: safe loaders only
+        except yaml.YAMLError as e:
+            raise ValueError(str(e)) from e
+
+
+def id_keys(data: Dict[Any, Any]) -> Dict[int, Any]:
+    """Restore the keys of a mapping keyed by discord ids, which JSON turns into strings.
+
+    Only for mappings known to be keyed by ids, other digit-only keys (names
+    a user typed) are kept as they were written.
+    """
+    return {int(key): value for key, value in data.items()}
+
+
+class JsonSerializer(Serializer):
+    """fast C-accelerated stdlib codec"""
+
+    name = "json"
+
+    def dumps(self, data: Any) -> bytes:
+        # newline-terminated like YAML, so loads_any never takes it for msgpack
+        return (json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def loads(self, raw: bytes) -> Any:
+        return json.loads(raw)
+
+
+class MsgpackSerializer(Serializer):
+    """compact binary format, keeps integer keys"""
+
+    name = "msgpack"
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise ValueError("The 'msgpack' format requires the msgpack package (pip install msgpack)")
+
+    def dumps(self, data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, raw: bytes) -> Any:
+        try:
+            return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise ValueError(str(e)) from e
+
+
+SERIALIZERS = {
+    YamlSerializer.name: YamlSerializer,
+    JsonSerializer.name: JsonSerializer,
+    MsgpackSerializer.name: MsgpackSerializer,
+}
+
+
+def get_serializer(name: str = "yaml") -> Serializer:
+    """
+    Raises:
+        ValueError: If the format is unknown or its package is missing.
+    """
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown storage format '{name}' ({', '.join(SERIALIZERS)})")
+    return SERIALIZERS[name]()
+
+
+def loads_any(raw: bytes) -> Any:
+    """Parse file contents in whatever format they were written in.
+
+    The format is sniffed from the content rather than taken from the config,
+    so a cog can switch formats and still read its old file. msgpack is tried
+    first: many msgpack payloads are valid UTF-8, while text that starts with
+    an ASCII character and goes on never unpacks as a single msgpack object
+    (the first byte is a complete object on its own).
+
+    Raises:
+        ValueError: If the contents can't be parsed.
+    """
+    if msgpack is not None and raw and not raw.isspace():
+        try:
+            return MsgpackSerializer().loads(raw)
+        except ValueError:
+            pass  # text
+
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return get_serializer(MsgpackSerializer.name).loads(raw)
+
+    if text.lstrip()[:1] in ("{", "["):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            pass  # YAML flow style
+    return get_serializer(YamlSerializer.name).loads(raw)
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+storage.py
+
+Bot-wide storage service: namespaced key-value and table access over a
+single SQLite database in WAL mode.
+"""
+
+# Standard library imports
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Local application imports
+from .serialization import JsonSerializer, Serializer
+
+# (sql, parameters, executemany?)
+Statement = Tuple[str, Any, bool]
+# statements applied together or not at all, future resolved after commit
+WriteOp = Tuple[List[Statement], "asyncio.Future[int]"]
+
+
+class Storage:
+    """SQLite store shared by all cogs
+
+    All writes go through one writer task: it drains the queue and commits
+    everything queued so far in a single transaction on the writer thread,
+    so many small updates cost one fsync. Reads run concurrently on a small
+    thread pool, each thread with its own connection (WAL readers never
+    block the writer).
+    """
+
+    def __init__(self, path: Path, readers: int = 2, batch_size: int = 256,
+                 serializer: Optional[Serializer] = None) -> None:
+        self.path: Path = Path(path)
+        self.batch_size: int = batch_size
+        self.serializer: Serializer = serializer or JsonSerializer()
+
+        self._queue: "asyncio.Queue[Optional[WriteOp]]" = asyncio.Queue()
+        self._writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-writer")
+        self._reader_executor = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="storage-reader")
+        self._writer_conn: Optional[sqlite3.Connection] = None
+        self._local = threading.local()
+        self._reader_conns: List[sqlite3.Connection] = []
+        self._writer_task: Optional[asyncio.Task] = None
+        self._closed: bool = False
+
+    async def start(self) -> None:
+        """open the database and start the writer task"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer_executor, self._open_writer)
+        self._writer_task = asyncio.create_task(self._writer())
+
+    def _open_writer(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS kv (
+                            namespace TEXT NOT NULL,
+                            key TEXT NOT NULL,
+                            value BLOB,
+                            PRIMARY KEY (namespace, key)
+                        ) WITHOUT ROWID""")
+        self._writer_conn = conn
+
+    async def close(self) -> None:
+        """commit everything queued, then close all connections"""
+        # set before the sentinel is queued, so no write can end up behind it
+        self._closed = True
+        if self._writer_task is not None:
+            self._queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+
+        def close_all() -> None:
+            for conn in self._reader_conns:
+                conn.close()
+            self._reader_conns.clear()
+        await asyncio.get_running_loop().run_in_executor(self._reader_executor, close_all)
+        if self._writer_conn is not None:
+            await asyncio.get_running_loop().run_in_executor(self._writer_executor, self._writer_conn.close)
+            self._writer_conn = None
+        self._writer_executor.shutdown()
+        self._reader_executor.shutdown()
+
+    # writes
+
+    async def _writer(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            op = await self._queue.get()
+            batch: List[WriteOp] = []
+            while op is not None:
+                batch.append(op)
+                if len(batch) >= self.batch_size or self._queue.empty():
+                    break
+                op = self._queue.get_nowait()
+            stopping = op is None
+
+            if batch:
+                try:
+                    results = await loop.run_in_executor(self._writer_executor, self._commit, batch)
+                except Exception as e:  # pylint: disable=broad-except
+                    # fail this batch, the writer has to keep serving the others
+                    results = [e] * len(batch)
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+    def _commit(self, batch: List[WriteOp]) -> List[Any]:
+        """run a batch in one transaction, a failing statement only rolls back itself"""
+        assert self._writer_conn is not None
+        conn = self._writer_conn
+        results: List[Any] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for statements, _ in batch:
+                conn.execute("SAVEPOINT op")
+                try:
+                    rowcount = 0
+                    for sql, params, many in statements:
+                        cursor = conn.executemany(sql, params) if many else conn.execute(sql, params)
+                        rowcount += cursor.rowcount
+                    results.append(rowcount)
+                    conn.execute("RELEASE op")
+                except Exception as e:  # pylint: disable=broad-except
+                    conn.execute("ROLLBACK TO op")
+                    conn.execute("RELEASE op")
+                    results.append(e)
+            conn.execute("COMMIT")
+        except Exception as e:  # pylint: disable=broad-except
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            return [e] * len(batch)
+        return results
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Queue a write statement and wait until its batch is committed.
+
+        Returns:
+            int: The number of affected rows.
+
+        Raises:
+            sqlite3.Error: If the statement fails or the storage is closed.
+        """
+        return await self._submit([(sql, params, False)])
+
+    async def executemany(self, sql: str, params: Iterable[Sequence[Any]]) -> int:
+        """like execute, for many parameter sets in the same batch"""
+        return await self._submit([(sql, list(params), True)])
+
+    async def _submit(self, statements: List[Statement]) -> int:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot write to a closed storage.")
+        future: "asyncio.Future[int]" = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((statements, future))
+        return await future
+
+    # reads
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA query_only=ON")
+            self._local.conn = conn
+            self._reader_conns.append(conn)
+        return conn
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        """run a read query on the reader pool"""
+        def query() -> List[Tuple[Any, ...]]:
+            return self._reader().execute(sql, params).fetchall()
+        return await asyncio.get_running_loop().run_in_executor(self._reader_executor, query)
+
+    # key-value access
+
+    async def get(self, namespace: str, key: Any, default: Any = None) -> Any:
+        rows = await self.fetchall(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, str(key)))
+        return self.serializer.loads(rows[0][0]) if rows else default
+
+    async def items(self, namespace: str) -> Dict[str, Any]:
+        rows = await self.fetchall("SELECT key, value FROM kv WHERE namespace = ?", (namespace,))
+        return {key: self.serializer.loads(value) for key, value in rows}
+
+    async def set(self, namespace: str, key: Any, value: Any) -> None:
+        await self.execute(
+            "INSERT INTO kv (namespace, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value",
+            (namespace, str(key), self.serializer.dumps(value)))
+
+    async def delete(self, namespace: str, key: Any) -> None:
+        await self.execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, str(key)))
+
+    async def update(self, namespace: str, items: Dict[Any, Any], delete: Iterable[Any] = ()) -> None:
+        """set several keys and delete others, all in one savepoint"""
+        await self._submit([
+            ("INSERT INTO kv (namespace, key, value) VALUES (?, ?, ?) "
+             "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value",
+             [(namespace, str(key), self.serializer.dumps(value)) for key, value in items.items()], True),
+            ("DELETE FROM kv WHERE namespace = ? AND key = ?",
+             [(namespace, str(key)) for key in delete], True),
+        ])
+
+    async def clear(self, namespace: str) -> None:
+        await self.execute("DELETE FROM kv WHERE namespace = ?", (namespace,))
+
+    def namespace(self, name: str) -> "Namespace":
+        return Namespace(self, name)
+
+
+class Namespace:
+    """a cog's view of the storage: its own keys and its own tables"""
+
+    def __init__(self, storage: Storage, name: str) -> None:
+        self.storage: Storage = storage
+        self.name: str = name
+
+    async def get(self, key: Any, default: Any = None) -> Any:
+        return await self.storage.get(self.name, key, default)
+
+    async def items(self) -> Dict[str, Any]:
+        return await self.storage.items(self.name)
+
+    async def set(self, key: Any, value: Any) -> None:
+        await self.storage.set(self.name, key, value)
+
+    async def delete(self, key: Any) -> None:
+        await self.storage.delete(self.name, key)
+
+    async def update(self, items: Dict[Any, Any], delete: Iterable[Any] = ()) -> None:
+        await self.storage.update(self.name, items, delete)
+
+    async def clear(self) -> None:
+        await self.storage.clear(self.name)
+
+    def table(self, name: str) -> str:
+        """quoted name of a table private to this namespace, for use in SQL"""
+        return '"' + f"{self.name}_{name}".replace('"', '""') + '"'
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        return await self.storage.execute(sql, params)
+
+    async def executemany(self, sql: str, params: Iterable[Sequence[Any]]) -> int:
+        return await self.storage.executemany(sql, params)
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple[Any, ...]]:
+        return await self.storage.fetchall(sql, params)
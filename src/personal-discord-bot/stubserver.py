@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+stubserver.py
+
+In-process aiohttp server that imitates the HuggingFace and OpenAI inference
+APIs with configurable latency and payload size.
+"""
+
+# Standard library imports
+import asyncio
+import base64
+import random
+import time
+from typing import Dict, Optional
+
+# Third-party library imports
+from aiohttp import web
+
+
+class StubServer:
+    """fake inference endpoint, served on localhost"""
+
+    def __init__(
+        self,
+        latency: float = 0.2,
+        jitter: float = 0.0,
+        payload_size: int = 512,
+        image_size: int = 64 * 1024,
+        cold_start: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        Args:
+            latency: Mean seconds every request takes.
+            jitter: Seconds added or removed at random from the latency.
+            payload_size: Characters of generated text per response.
+            image_size: Bytes of image data per response.
+            cold_start: Seconds after start during which every model answers 503 (loading).
+            host: Interface to bind to.
+            port: Port to bind to, 0 picks a free one.
+        """
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.payload_size: int = payload_size
+        self.image_size: int = image_size
+        self.cold_start: float = cold_start
+        self.host: str = host
+        self.port: int = port
+        self.requests: int = 0
+
+        self._runner: Optional[web.AppRunner] = None
+        self._started: float = 0.0
+        self._image: bytes = b"\x89PNG\r\n\x1a\n" + b"\0" * max(0, image_size - 8)
+
+    @property
+    def url(self) -> str:
+        """base url of the running server"""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """start serving, resolves the port if 0 was given"""
+        app = web.Application()
+        app.router.add_post("/models/{model:.+}", self._huggingface)
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/images/generations", self._image_generations)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]  # type: ignore
+        self._started = time.monotonic()
+
+    async def stop(self) -> None:
+        """stop serving"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _delay(self) -> Optional[web.Response]:
+        """simulate model latency, returns a 503 while the model is 'loading'"""
+        self.requests += 1
+        remaining = self.cold_start - (time.monotonic() - self._started)
+        if remaining > 0:
+            return web.json_response(
+                {"error": "Model is currently loading", "estimated_time": remaining}, status=503)
+
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        return None
+
+    def _text(self) -> str:
+        return ("lorem ipsum " * (self.payload_size // 12 + 1))[:self.payload_size]
+
+    async def _huggingface(self, request: web.Request) -> web.Response:
+        body: Dict = await request.json()
+        loading = await self._delay()
+        if loading is not None:
+            return loading
+
+        # text models are called with generation parameters, image models without
+        if "parameters" in body:
+            return web.json_response([{"generated_text": self._text()}])
+        return web.Response(body=self._image, content_type="image/png")
+
+    async def _chat_completions(self, request: web.Request) -> web.Response:
+        await request.json()
+        loading = await self._delay()
+        if loading is not None:
+            return loading
+        return web.json_response(
+            {"choices": [{"index": 0, "message": {"role": "assistant", "content": self._text()}}]})
+
+    async def _image_generations(self, request: web.Request) -> web.Response:
+        await request.json()
+        loading = await self._delay()
+        if loading is not None:
+            return loading
+        return web.json_response({"data": [{"b64_json": base64.b64encode(self._image).decode()}]})
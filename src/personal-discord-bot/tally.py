@@ -3,17 +3,25 @@
 tally.py
 """
 # Standard library imports
+import asyncio
 import random
+import struct
+import time
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, TYPE_CHECKING, Any
+from typing import DefaultDict, Dict, TYPE_CHECKING, Any
 
 # Third-party imports
+import discord
 from discord.ext import commands
 
 # Local application/library specific imports
 from .basecog import BaseCog
 from .config import CogConfig
+from .journal import Journal
 from .logger import LoggingMiddleware
+from .serialization import id_keys
+from .tallyhistory import WINDOWS, TallyHistory
 
 if TYPE_CHECKING:
     from .bot import MyBot
@@ -29,15 +37,63 @@ class Tally(BaseCog):
         self._path: Path = self._config.path
         self._start_amount: int = 0
 
-        self._depot_users: Dict[int, int] = {}
+        self._compact_every: int = getattr(self._config, "compact_every", 500)
+
+        self._history: TallyHistory = TallyHistory()
+        # all-time totals per user, maintained by the history
+        self._depot_users: Dict[int, int] = self._history.windows["all"].counts
+        self._journal: Journal = Journal(self._path, self._serializer)
+        self._locks: DefaultDict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    async def cog_load(self) -> None:
+        """load the snapshot and replay the journal once"""
+        await super().cog_load()
+        try:
+            state, events = await self._journal.load()
+            blob = await self._journal.read_attachment("history")
+        except Exception as e:
+            # refuse to load: running on empty totals would reuse sequence
+            # numbers and the next compaction would overwrite the snapshot
+            await self.logger.log_error(self, f"Error loading tally data from {self._path}: {e}")
+            await self._journal.close()
+            raise
+
+        state = state or {}
+        if "users" not in state:
+            # plain {user_id: count} from before the history was recorded
+            state = {"users": state, "events": 0}
+
+        try:
+            history = TallyHistory.from_bytes(blob, limit=state["events"]) if blob else TallyHistory()
+        except (ValueError, struct.error) as e:
+            await self.logger.log_error(self, f"Error loading tally history, starting without: {e}")
+            history = TallyHistory()
+        history.seed_totals(id_keys(state["users"]))
+        for event in events:
+            history.add(int(event["user"]), int(event.get("by", 0)), event.get("ts"))
+
+        self._history = history
+        self._depot_users = history.windows["all"].counts
+        await self.logger.log_info(
+            self, f"Loaded {len(self._depot_users)} users and {len(history)} events from {self._path} "
+            f"({len(events)} from the journal).")
+
+    def _compact(self) -> "asyncio.Future[None]":
+        """queue folding the journal into the snapshot and history file"""
+        state = {"users": dict(self._depot_users), "events": len(self._history)}
+        return self._journal.compact(state, {"history": self._history.to_bytes()})
+
+    async def cog_unload(self) -> None:
+        """fold the journal into the snapshot and stop writing"""
+        if self._journal.pending:
+            await self._compact()
+        await self._journal.close()
+        await super().cog_unload()
 
     @commands.command()
     async def tally(self, ctx: commands.Context, target: commands.MemberConverter) -> None:
         """send message to channel with tally of ctx author"""
 
-        if not self._depot_users:
-            await self.load_data_from_file(self._path)
-
         if target == None:
             user = ctx.author
         else:
@@ -61,22 +117,63 @@ class Tally(BaseCog):
         if user == None:
             return
 
-        if not self._depot_users:
-            await self.load_data_from_file(self._path)
-
-        if user.id not in self._depot_users:
-            self._depot_users[user.id] = 1
-            variant_msgs = [f"So, {user.mention}, that was your first one."]
-            msg = random.choice(variant_msgs)
+        # serialize increments per user, so the count in the reply matches the journal
+        async with self._locks[user.id]:
+            if user.id not in self._depot_users:
+                variant_msgs = [f"So, {user.mention}, that was your first one."]
+                msg = random.choice(variant_msgs)
 
-        else:
-            self._depot_users[user.id] += 1
-            variant_msgs = [
-                f"That's +1 for {user.mention}."]
-            msg = random.choice(variant_msgs)
+            else:
+                variant_msgs = [
+                    f"That's +1 for {user.mention}."]
+                msg = random.choice(variant_msgs)
+
+            now = time.time()
+            self._history.add(user.id, ctx.author.id, now)
+            writes = [self._journal.append(
+                {"user": user.id, "delta": 1, "ts": now, "by": ctx.author.id})]
+            if self._journal.pending >= self._compact_every:
+                writes.append(self._compact())
+
+            try:
+                for write in writes:
+                    await write
+            except (OSError, ValueError) as e:
+                await self.logger.log_error(self, f"Error writing tally journal: {e}")
 
         await ctx.send(msg)
-        await self.save_data_to_file(self._depot_users, self._path)
+
+    @commands.command(name="tally_top", aliases=["tallytop"], help="Show the top 10: !tally_top [week|month|all]")
+    async def tally_top(self, ctx: commands.Context, window: str = "all") -> None:
+        """send the users with the most tallies in a rolling window"""
+
+        window = window.lower()
+        if window not in WINDOWS:
+            await ctx.send(f"Unknown window '{window}', use one of: {', '.join(WINDOWS)}.")
+            return
+
+        top = self._history.top(window, 10)
+        if not top:
+            await ctx.send(f"No tallies in window '{window}' yet.")
+            return
+
+        lines = [f"{rank}. <@{user_id}>: {count}" for rank, (user_id, count) in enumerate(top, start=1)]
+        await ctx.send(f"Top tallies ({window}):\n" + "\n".join(lines),
+                       allowed_mentions=discord.AllowedMentions.none())
+
+    @commands.command(name="tally_stats", aliases=["tallystats"], help="Show tally stats: !tally_stats @user")
+    async def tally_stats(self, ctx: commands.Context, user: commands.MemberConverter) -> None:
+        """send a user's tally counts and ranks per window"""
+
+        stats = self._history.stats(user.id)
+        lines = []
+        for window, (count, rank) in stats.items():
+            lines.append(f"{window}: {count}" + (f" (#{rank})" if rank else ""))
+        last = self._history.last_tally(user.id)
+        if last:
+            lines.append(f"last tally: <t:{last}:R>")
+        await ctx.send(f"Tallies of {user.mention}:\n" + "\n".join(lines),
+                       allowed_mentions=discord.AllowedMentions.none())
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+tallyhistory.py
+
+Timestamped tally events in compact arrays, with incrementally maintained
+rolling-window counters and rankings.
+"""
+
+# Standard library imports
+import struct
+import time
+from array import array
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+# rolling windows in seconds, None means all time
+WINDOWS: Dict[str, Optional[int]] = {
+    "week": 7 * 24 * 3600,
+    "month": 30 * 24 * 3600,
+    "all": None,
+}
+
+_HEADER = struct.Struct("<4sII")
+_MAGIC = b"TLY1"
+
+
+class Ranking:
+    """users sorted by count (descending), updated in O(log n) search + shift"""
+
+    def __init__(self) -> None:
+        self._keys: List[Tuple[int, int]] = []  # (-count, user_id)
+
+    def update(self, user_id: int, old: int, new: int) -> None:
+        """move a user from count old to count new (0 means absent)"""
+        if old:
+            index = bisect_left(self._keys, (-old, user_id))
+            del self._keys[index]
+        if new:
+            insort(self._keys, (-new, user_id))
+
+    def top(self, n: int) -> List[Tuple[int, int]]:
+        """the n highest (user_id, count) pairs"""
+        return [(user_id, -count) for count, user_id in self._keys[:n]]
+
+    def rank(self, user_id: int, count: int) -> Optional[int]:
+        """1-based rank of a user holding count, None if absent"""
+        if not count:
+            return None
+        # users with the same count share the rank of the first of them
+        return bisect_left(self._keys, (-count, -1)) + 1
+
+
+class Window:
+    """counters for the events inside one rolling window"""
+
+    def __init__(self, span: Optional[int]) -> None:
+        self.span: Optional[int] = span
+        self.tail: int = 0  # index of the oldest event still inside the window
+        self.counts: Dict[int, int] = {}
+        self.ranking: Ranking = Ranking()
+
+    def add(self, user_id: int, delta: int = 1) -> None:
+        old = self.counts.get(user_id, 0)
+        new = old + delta
+        if new:
+            self.counts[user_id] = new
+        else:
+            self.counts.pop(user_id, None)
+        self.ranking.update(user_id, old, new)
+
+
+class TallyHistory:
+    """append-only history of tally events
+
+    Events are kept in three parallel arrays (timestamp, user index, issuer
+    index, 12 bytes per event), user ids are interned once. Window counters
+    are updated on every append and by advancing each window's tail past
+    expired events, so queries never scan the history.
+    """
+
+    def __init__(self) -> None:
+        self.timestamps: array = array("I")
+        self.users: array = array("I")
+        self.issuers: array = array("I")
+
+        self._ids: List[int] = []
+        self._index: Dict[int, int] = {}
+
+        self.windows: Dict[str, Window] = {name: Window(span) for name, span in WINDOWS.items()}
+        self._last: Dict[int, int] = {}  # user_id -> timestamp of the latest tally
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def _intern(self, user_id: int) -> int:
+        index = self._index.get(user_id)
+        if index is None:
+            index = self._index[user_id] = len(self._ids)
+            self._ids.append(user_id)
+        return index
+
+    def seed_totals(self, totals: Dict[int, int]) -> None:
+        """all-time counts from before timestamps were recorded"""
+        for user_id, count in totals.items():
+            self.windows["all"].add(user_id, count)
+
+    def add(self, user_id: int, issuer_id: int, timestamp: Optional[float] = None) -> None:
+        """append one tally event"""
+        ts = int(timestamp if timestamp is not None else time.time())
+        self.timestamps.append(ts)
+        self.users.append(self._intern(user_id))
+        self.issuers.append(self._intern(issuer_id))
+        self._last[user_id] = max(ts, self._last.get(user_id, 0))
+        for window in self.windows.values():
+            window.add(user_id)
+
+    def _expire(self, window: Window, now: float) -> None:
+        """advance the window's tail past events older than its span"""
+        if window.span is None:
+            return
+        cutoff = now - window.span
+        while window.tail < len(self.timestamps) and self.timestamps[window.tail] < cutoff:
+            window.add(self._ids[self.users[window.tail]], -1)
+            window.tail += 1
+
+    def top(self, window: str, n: int = 10) -> List[Tuple[int, int]]:
+        """the n users with the most tallies in a window, as (user_id, count)"""
+        current = self.windows[window]
+        self._expire(current, time.time())
+        return current.ranking.top(n)
+
+    def stats(self, user_id: int) -> Dict[str, Tuple[int, Optional[int]]]:
+        """(count, rank) of a user for every window"""
+        now = time.time()
+        result: Dict[str, Tuple[int, Optional[int]]] = {}
+        for name, window in self.windows.items():
+            self._expire(window, now)
+            count = window.counts.get(user_id, 0)
+            result[name] = (count, window.ranking.rank(user_id, count))
+        return result
+
+    def last_tally(self, user_id: int) -> Optional[int]:
+        """timestamp of the latest recorded tally of a user"""
+        return self._last.get(user_id)
+
+    def to_bytes(self) -> bytes:
+        """serialize ids and event arrays into a compact binary blob"""
+        ids = array("q", self._ids)
+        return b"".join((
+            _HEADER.pack(_MAGIC, len(ids), len(self.timestamps)),
+            ids.tobytes(), self.timestamps.tobytes(), self.users.tobytes(), self.issuers.tobytes(),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, limit: Optional[int] = None) -> "TallyHistory":
+        """Deserialize a blob written by to_bytes.
+
+        Args:
+            data: The blob.
+            limit: Only keep the first limit events (the ones contained in the snapshot).
+        """
+        history = cls()
+        magic, n_ids, n_events = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("not a tally history file")
+
+        offset = _HEADER.size
+        ids = array("q")
+        ids.frombytes(data[offset:offset + n_ids * ids.itemsize])
+        offset += n_ids * ids.itemsize
+        for column in (history.timestamps, history.users, history.issuers):
+            size = n_events * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+
+        if limit is not None and limit < n_events:
+            for column in (history.timestamps, history.users, history.issuers):
+                del column[limit:]
+
+        history._ids = ids.tolist()
+        history._index = {user_id: index for index, user_id in enumerate(history._ids)}
+        history._rebuild()
+        return history
+
+    def _rebuild(self) -> None:
+        """recompute window counters, only touching events inside each window"""
+        now = time.time()
+        for window in self.windows.values():
+            if window.span is None:
+                continue  # all-time totals are seeded from the snapshot
+            window.tail = bisect_left(self.timestamps, int(now - window.span))
+            for i in range(window.tail, len(self.users)):
+                window.add(self._ids[self.users[i]])
+
+        for i, user in enumerate(self.users):
+            user_id = self._ids[user]
+            self._last[user_id] = max(self.timestamps[i], self._last.get(user_id, 0))
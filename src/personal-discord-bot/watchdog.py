@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+watchdog.py
+
+Event-loop lag watchdog: a probe task measures how late the loop wakes up,
+and a helper thread notices when the loop stops ticking altogether and logs
+the stack of the blocking code while it is still blocking.
+"""
+
+# Standard library imports
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from logging import Logger
+from typing import Deque, Dict, Optional
+
+
+class LoopWatchdog:
+    """Measures event-loop lag and reports what blocked the loop.
+
+    The probe sleeps for interval and records how much later than that it
+    woke up. The helper thread checks the probe's heartbeat; once it is older
+    than threshold, the loop is blocked right now, so the main thread's
+    current stack (sys._current_frames) and the running task show the culprit.
+    """
+
+    def __init__(self, logger: Logger, interval: float = 0.1, threshold: float = 0.25,
+                 history: int = 6000) -> None:
+        self.logger: Logger = logger
+        self.interval: float = interval
+        self.threshold: float = threshold
+        self.lags: Deque[float] = deque(maxlen=history)  # seconds, the most recent probes
+        self.stalls: int = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._heartbeat: float = time.monotonic()
+        self._probe_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """start probing the running loop, call from inside it"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._probe_task = asyncio.create_task(self._probe())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def _probe(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lags.append(max(0.0, now - started - self.interval))
+            self._heartbeat = now
+
+    def _watch(self) -> None:
+        """helper thread: report each stall once, while it is happening"""
+        reported = False
+        while not self._stopped.wait(self.interval):
+            blocked = time.monotonic() - self._heartbeat
+            if blocked < self.threshold + self.interval:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            self.stalls += 1
+            self.logger.warning(
+                f"Event loop blocked for {blocked * 1000:.0f} ms in {self._current_task()}:\n{self._loop_stack()}")
+
+    def _loop_stack(self) -> str:
+        frame = sys._current_frames().get(self._loop_thread)  # pylint: disable=protected-access
+        if frame is None:
+            return "(no stack)"
+        return "".join(traceback.format_stack(frame, limit=20))  # innermost frames
+
+    def _current_task(self) -> str:
+        # read from another thread: good enough for a diagnostic, the loop is stuck anyway
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        if task is None:
+            return "a callback outside any task"
+        return f"task {task.get_name()} ({task.get_coro()!r})"
+
+    def percentiles(self) -> Dict[str, float]:
+        """p50/p95/p99/max of the recent lags, in ms"""
+        lags = sorted(self.lags)
+        if not lags:
+            return {}
+        result = {f"p{q}": lags[min(len(lags) - 1, int(q / 100 * len(lags)))] * 1000 for q in (50, 95, 99)}
+        result["max"] = lags[-1] * 1000
+        return result
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+This file contains the unit-tests for journal.py.
+"""
+# Standard library imports
+import asyncio
+import importlib
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+journal = importlib.import_module("personal-discord-bot.journal")
+
+
+def run_load(path: Path) -> Tuple[Optional[Any], List[Dict[str, Any]], int]:
+    """load a journal in a fresh instance, returns (state, events, seq)"""
+    async def load() -> Tuple[Optional[Any], List[Dict[str, Any]], int]:
+        log = journal.Journal(path)
+        state, events = await log.load()
+        await log.close()
+        return state, events, log.seq
+    return asyncio.run(load())
+
+
+def test_replay_after_compaction(tmp_path: Path) -> None:
+    """
+    Only events appended after the last compaction are replayed.
+    """
+    path = tmp_path / "tally.yaml"
+
+    async def write() -> None:
+        log = journal.Journal(path)
+        await log.load()
+        for user in (1, 2):
+            await log.append({"user": user})
+        await log.compact({"users": {1: 1, 2: 1}})
+        await log.append({"user": 3})
+        await log.close()
+
+    asyncio.run(write())
+    state, events, seq = run_load(path)
+    assert state == {"users": {1: 1, 2: 1}}
+    assert [event["user"] for event in events] == [3]
+    assert seq == 3
+
+
+def test_stale_journal_is_not_replayed(tmp_path: Path) -> None:
+    """
+    Events already in the snapshot are skipped if the journal wasn't truncated.
+    """
+    path = tmp_path / "tally.yaml"
+
+    async def write() -> None:
+        log = journal.Journal(path)
+        await log.load()
+        await log.append({"user": 1})
+        await log.append({"user": 2})
+        await log.close()
+
+    asyncio.run(write())
+    stale = path.with_name(path.name + ".journal").read_bytes()
+    path.write_text("seq: 1\nstate: {}\n", encoding="utf-8")
+
+    _, events, seq = run_load(path)
+    assert path.with_name(path.name + ".journal").read_bytes() == stale
+    assert [event["user"] for event in events] == [2]
+    assert seq == 2
+
+
+def test_torn_last_line_then_append(tmp_path: Path) -> None:
+    """
+    A partial line left by a crash is dropped and later appends stay readable.
+    """
+    path = tmp_path / "tally.yaml"
+
+    async def write() -> None:
+        log = journal.Journal(path)
+        await log.load()
+        await log.append({"user": 1})
+        await log.close()
+
+    asyncio.run(write())
+    with open(path.with_name(path.name + ".journal"), "ab") as file:
+        file.write(b'{"user":2,"se')
+
+    async def resume() -> None:
+        log = journal.Journal(path)
+        _, events = await log.load()
+        assert [event["user"] for event in events] == [1]
+        await log.append({"user": 3})
+        await log.close()
+
+    asyncio.run(resume())
+    _, events, seq = run_load(path)
+    assert [(event["user"], event["seq"]) for event in events] == [(1, 1), (3, 2)]
+    assert seq == 2
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+This file contains the unit-tests for scheduler.py.
+"""
+# Standard library imports
+import asyncio
+import importlib
+import sys
+import time
+from pathlib import Path
+from typing import Any, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+scheduler = importlib.import_module("personal-discord-bot.scheduler")
+storage = importlib.import_module("personal-discord-bot.storage")
+
+
+class Recorder:
+    """callback that records every (key, payload) it runs for"""
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, Any]] = []
+
+    async def __call__(self, key: str, payload: Any) -> None:
+        self.calls.append((key, payload))
+
+
+def test_rescheduled_deadline_fires_once(tmp_path: Path) -> None:
+    """
+    Replacing a job leaves a stale heap entry that must not fire, the new deadline fires once.
+    """
+    async def run() -> None:
+        store = storage.Storage(tmp_path / "bot.db")
+        await store.start()
+        recorder = Recorder()
+        jobs = scheduler.DeadlineScheduler(store.namespace("Poll"), recorder)
+        await jobs.start()
+
+        now = time.time()
+        await jobs.schedule("a", now + 0.05, "first")
+        await jobs.schedule("a", now + 0.2, "second")
+        await asyncio.sleep(0.1)
+        assert recorder.calls == []
+        assert jobs.deadline("a") == now + 0.2
+
+        await asyncio.sleep(0.25)
+        assert recorder.calls == [("a", "second")]
+        assert len(jobs) == 0
+        await jobs.stop()
+        assert await store.namespace("Poll").items() == {}
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_cancelled_job_never_fires(tmp_path: Path) -> None:
+    """
+    A cancelled job is skipped, jobs behind it still fire in deadline order.
+    """
+    async def run() -> None:
+        store = storage.Storage(tmp_path / "bot.db")
+        await store.start()
+        recorder = Recorder()
+        jobs = scheduler.DeadlineScheduler(store.namespace("Poll"), recorder)
+        await jobs.start()
+
+        now = time.time()
+        await jobs.schedule("c", now + 0.1)
+        await jobs.schedule("a", now + 0.02)
+        await jobs.schedule("b", now + 0.05)
+        assert await jobs.cancel("a")
+        assert not await jobs.cancel("a")
+
+        await asyncio.sleep(0.2)
+        assert [key for key, _ in recorder.calls] == ["b", "c"]
+        await jobs.stop()
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_jobs_resume_after_restart(tmp_path: Path) -> None:
+    """
+    Stored jobs run once after a restart, overdue ones right away, and are then removed.
+    """
+    path = tmp_path / "bot.db"
+
+    async def before_restart() -> None:
+        store = storage.Storage(path)
+        await store.start()
+        jobs = scheduler.DeadlineScheduler(store.namespace("Poll"), Recorder())
+        await jobs.start()
+        await jobs.schedule("overdue", time.time() + 0.05, {"id": 1})
+        await jobs.schedule("later", time.time() + 0.3, {"id": 2})
+        await jobs.stop()  # the bot goes down before either deadline
+        await store.close()
+
+    async def after_restart() -> List[Tuple[str, Any]]:
+        await asyncio.sleep(0.1)
+        store = storage.Storage(path)
+        await store.start()
+        recorder = Recorder()
+        jobs = scheduler.DeadlineScheduler(store.namespace("Poll"), recorder)
+        await jobs.start()
+        await asyncio.sleep(0.05)
+        assert recorder.calls == [("overdue", {"id": 1})]
+
+        await asyncio.sleep(0.35)
+        await jobs.stop()
+        assert await store.namespace("Poll").items() == {}
+        await store.close()
+        return recorder.calls
+
+    asyncio.run(before_restart())
+    assert asyncio.run(after_restart()) == [("overdue", {"id": 1}), ("later", {"id": 2})]
+
+
+def test_job_rescheduled_from_its_callback_stays_stored(tmp_path: Path) -> None:
+    """
+    A callback that schedules its own key again keeps the job, it fires again later.
+    """
+    async def run() -> None:
+        store = storage.Storage(tmp_path / "bot.db")
+        await store.start()
+        calls: List[float] = []
+        jobs: Any = None
+
+        async def repeat(key: str, payload: Any) -> None:
+            calls.append(time.time())
+            if len(calls) == 1:
+                await jobs.schedule(key, time.time() + 0.05, payload)
+
+        jobs = scheduler.DeadlineScheduler(store.namespace("Poll"), repeat)
+        await jobs.start()
+        await jobs.schedule("tick", time.time() + 0.02)
+        await asyncio.sleep(0.04)
+        assert len(calls) == 1
+        assert list(await store.namespace("Poll").items()) == ["tick"]
+
+        await asyncio.sleep(0.1)
+        assert len(calls) == 2
+        await jobs.stop()
+        assert await store.namespace("Poll").items() == {}
+        await store.close()
+
+    asyncio.run(run())
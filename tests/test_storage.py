@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+This file contains the unit-tests for storage.py.
+"""
+# Standard library imports
+import asyncio
+import importlib
+import sqlite3
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+storage = importlib.import_module("personal-discord-bot.storage")
+
+CREATE = "CREATE TABLE items (name TEXT PRIMARY KEY)"
+INSERT = "INSERT INTO items (name) VALUES (?)"
+
+
+def test_failing_op_keeps_the_rest_of_its_batch(tmp_path: Path) -> None:
+    """
+    A failing write only rolls back itself, the other writes of its batch are committed.
+    """
+    async def run() -> List[str]:
+        store = storage.Storage(tmp_path / "bot.db")
+        await store.start()
+        await store.execute(CREATE)
+
+        batches: List[int] = []
+        commit = store._commit
+
+        def spy(batch):
+            batches.append(len(batch))
+            return commit(batch)
+        store._commit = spy
+
+        results = await asyncio.gather(
+            store.execute(INSERT, ("a",)),
+            store.execute(INSERT, ("a",)),  # duplicate key
+            store.executemany(INSERT, [("b",), ("c",)]),
+            return_exceptions=True)
+        assert batches == [3]
+        assert results[0] == 1 and results[2] == 2
+        assert isinstance(results[1], sqlite3.IntegrityError)
+
+        rows = await store.fetchall("SELECT name FROM items ORDER BY name")
+        await store.close()
+        return [name for name, in rows]
+
+    assert asyncio.run(run()) == ["a", "b", "c"]
+
+
+def test_failing_multi_statement_op_is_undone_as_a_whole(tmp_path: Path) -> None:
+    """
+    The statements of one op (as queued by Storage.update) are committed together or not at all.
+    """
+    async def run() -> List[str]:
+        store = storage.Storage(tmp_path / "bot.db")
+        await store.start()
+        await store.execute(CREATE)
+        await store.execute(INSERT, ("a",))
+
+        with pytest.raises(sqlite3.IntegrityError):
+            await store._submit([(INSERT, [("b",), ("c",)], True), (INSERT, ("a",), False)])
+        rows = await store.fetchall("SELECT name FROM items ORDER BY name")
+        await store.close()
+        return [name for name, in rows]
+
+    assert asyncio.run(run()) == ["a"]
+
+
+def test_update_sets_and_deletes_keys(tmp_path: Path) -> None:
+    """
+    Namespace.update writes and removes keys of its own namespace only.
+    """
+    async def run() -> None:
+        store = storage.Storage(tmp_path / "bot.db")
+        await store.start()
+        space = store.namespace("Cog")
+        await store.namespace("Other").set(1, "other")
+        await space.update({1: {"a": 1}, 2: "two"})
+        await space.update({3: "three"}, delete=[1])
+        assert await space.items() == {"2": "two", "3": "three"}
+        assert await store.namespace("Other").items() == {"1": "other"}
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_writer_survives_errors_other_than_sqlite(tmp_path: Path) -> None:
+    """
+    An unexpected exception fails its batch, later writes still go through.
+    """
+    async def run() -> None:
+        store = storage.Storage(tmp_path / "bot.db")
+        await store.start()
+        await store.execute(CREATE)
+
+        commit = store._commit
+
+        def broken(batch):
+            raise RuntimeError("executor gone")
+        store._commit = broken
+        with pytest.raises(RuntimeError):
+            await store.execute(INSERT, ("a",))
+
+        store._commit = commit
+        assert await asyncio.wait_for(store.execute(INSERT, ("b",)), 5) == 1
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_close_commits_queued_writes_and_rejects_new_ones(tmp_path: Path) -> None:
+    """
+    Writes queued before close are committed, writes after it raise instead of hanging.
+    """
+    path = tmp_path / "bot.db"
+
+    async def run() -> None:
+        store = storage.Storage(path)
+        await store.start()
+        await store.execute(CREATE)
+        pending = asyncio.ensure_future(store.executemany(INSERT, [("a",), ("b",)]))
+        await asyncio.sleep(0)  # queued, not committed yet
+        await store.close()
+        assert pending.result() == 2
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            await asyncio.wait_for(store.execute(INSERT, ("c",)), 5)
+
+    asyncio.run(run())
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 2
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+This file contains the unit-tests for tallyhistory.py.
+"""
+# Standard library imports
+import importlib
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+tallyhistory = importlib.import_module("personal-discord-bot.tallyhistory")
+
+DAY = 24 * 3600
+WEEK = tallyhistory.WINDOWS["week"]
+
+
+class Clock:
+    """replacement for time.time that only moves when told to"""
+
+    def __init__(self, now: int) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def brute_force(events: List[Tuple[int, int]], now: int, span: int) -> Dict[int, int]:
+    """count (timestamp, user) events inside [now - span, now]"""
+    return dict(Counter(user for ts, user in events if ts >= now - span))
+
+
+def test_week_window_expiry(monkeypatch) -> None:
+    """
+    The incrementally expired week counters match a full count at every step.
+    """
+    rng = random.Random(42)
+    clock = Clock(1_700_000_000)
+    monkeypatch.setattr(tallyhistory.time, "time", clock)
+
+    history = tallyhistory.TallyHistory()
+    events: List[Tuple[int, int]] = []
+    for _ in range(500):
+        clock.now += rng.randint(0, DAY // 2)
+        user = rng.randint(1, 8)
+        history.add(user, 99, clock.now)
+        events.append((clock.now, user))
+
+        if rng.random() < 0.2:
+            clock.now += rng.randint(0, 3 * DAY)
+            expected = brute_force(events, clock.now, WEEK)
+            top = history.top("week", 100)
+            assert dict(top) == expected
+            assert [count for _, count in top] == sorted(expected.values(), reverse=True)
+            for user_id, count in expected.items():
+                assert history.stats(user_id)["week"][0] == count
+
+
+def test_round_trip_rebuilds_windows(monkeypatch) -> None:
+    """
+    A history read back from bytes has the same window counts as a full count.
+    """
+    rng = random.Random(7)
+    clock = Clock(1_700_000_000)
+    monkeypatch.setattr(tallyhistory.time, "time", clock)
+
+    history = tallyhistory.TallyHistory()
+    events: List[Tuple[int, int]] = []
+    for _ in range(300):
+        clock.now += rng.randint(0, DAY)
+        user = rng.randint(1, 5)
+        history.add(user, 99, clock.now)
+        events.append((clock.now, user))
+
+    clock.now += 2 * DAY
+    restored = tallyhistory.TallyHistory.from_bytes(history.to_bytes(), limit=250)
+    assert len(restored) == 250
+    for name in ("week", "month"):
+        expected = brute_force(events[:250], clock.now, tallyhistory.WINDOWS[name])
+        assert dict(restored.top(name, 100)) == expected